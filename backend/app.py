@@ -18,7 +18,7 @@ try:
     from .services.overtime_service import OvertimeService
     from .services.remember_me_service import RememberMeService
     from .services.auth_token_service import AuthTokenService
-    from .services.leave_balance_service import LeaveBalanceService
+    from .services.leave_balance_service import LeaveBalanceService, invalidate_leave_balance
     from .services.title_generator import generate_conversation_title, update_title_if_needed
     from .services.manager_helper import (
         get_team_overview,
@@ -56,7 +56,7 @@ except Exception:
     from services.overtime_service import OvertimeService
     from services.remember_me_service import RememberMeService
     from services.auth_token_service import AuthTokenService
-    from services.leave_balance_service import LeaveBalanceService
+    from services.leave_balance_service import LeaveBalanceService, invalidate_leave_balance
     from services.title_generator import generate_conversation_title, update_title_if_needed
     from services.manager_helper import (
         get_team_overview,
@@ -79,6 +79,7 @@ except Exception:
         cancel_timeoff_request,
     )
     from services.log_hours_flow import start_log_hours_flow, is_log_hours_trigger, start_log_hours_for_task, handle_log_hours_step, handle_log_hours_form_step, has_unlogged_tasks
+import atexit
 import os
 import sys
 import logging
@@ -234,6 +235,7 @@ def create_app():
     # Initialize services
     chatgpt_service = ChatGPTService()
     odoo_service = OdooService()
+    atexit.register(odoo_service.close)
     employee_service = EmployeeService(odoo_service)
     timeoff_service = TimeOffService(odoo_service, employee_service)
     halfday_service = HalfDayLeaveService()
@@ -407,6 +409,21 @@ def create_app():
             payload.update(extra)
         _log_usage_metric('document', thread_id, payload, employee)
 
+    def _inline_document_response(attachment: dict):
+        """Stream a document rendered with inline=True straight back as a download."""
+        from flask import Response
+        from urllib.parse import quote
+        payload = attachment['bytes']
+        filename = attachment['file_name']
+        return Response(
+            payload,
+            mimetype=attachment['mime_type'],
+            headers={
+                'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}",
+                'Content-Length': str(len(payload)),
+            },
+        )
+
     def _fetch_employee_profile() -> Optional[dict]:
         if not session.get('authenticated'):
             return None
@@ -4503,13 +4520,16 @@ def create_app():
 
             data = request.get_json(silent=True) or {}
             lang = (data.get('lang') or 'en').lower()
-            success, result = document_service.generate_employment_letter(lang=lang)
+            inline = bool(data.get('inline'))
+            success, result = document_service.generate_employment_letter(lang=lang, inline=inline)
             if success:
                 extra_meta = {
                     'attachment_name': result.get('filename') if isinstance(result, dict) else None,
                     'source': 'rest_api'
                 }
                 _log_document_metric(data.get('thread_id'), 'employment_letter', language=lang, extra=extra_meta)
+                if inline:
+                    return _inline_document_response(result)
                 return jsonify({
                     'success': True,
                     'attachment': result
@@ -4539,7 +4559,8 @@ def create_app():
             if not country or not start_date or not end_date:
                 return jsonify({'success': False, 'message': 'country, start_date and end_date are required'}), 400
 
-            success, result = document_service.generate_embassy_letter(country=country, start_date=start_date, end_date=end_date)
+            inline = bool(data.get('inline'))
+            success, result = document_service.generate_embassy_letter(country=country, start_date=start_date, end_date=end_date, inline=inline)
             if success:
                 extra_meta = {
                     'country': country,
@@ -4549,6 +4570,8 @@ def create_app():
                     'source': 'rest_api'
                 }
                 _log_document_metric(data.get('thread_id'), 'embassy_letter', extra=extra_meta)
+                if inline:
+                    return _inline_document_response(result)
                 return jsonify({'success': True, 'attachment': result})
             else:
                 return jsonify({'success': False, 'message': result}), 500
@@ -4563,13 +4586,16 @@ def create_app():
                 return jsonify({'success': False, 'message': 'Authentication required'}), 401
 
             payload = request.get_json(silent=True) or {}
-            success, result = document_service.generate_experience_letter()
+            inline = bool(payload.get('inline'))
+            success, result = document_service.generate_experience_letter(inline=inline)
             if success:
                 extra_meta = {
                     'attachment_name': result.get('filename') if isinstance(result, dict) else None,
                     'source': 'rest_api'
                 }
                 _log_document_metric(payload.get('thread_id'), 'experience_letter', extra=extra_meta)
+                if inline:
+                    return _inline_document_response(result)
                 return jsonify({'success': True, 'attachment': result})
             else:
                 return jsonify({'success': False, 'message': result}), 500
@@ -4580,8 +4606,9 @@ def create_app():
     def preview_service_agreement_api():
         """Generate a Service Agreement preview for a provided name and allowed companies.
 
-        Request JSON: { name: string, company_name: string }
-        Returns: { success: bool, attachment?: { file_name, file_url, mime_type }, message?: str }
+        Request JSON: { name: string, company_name: string, inline?: bool }
+        Returns: { success: bool, attachment?: { file_name, file_url, mime_type }, message?: str },
+        or the .docx itself as an attachment download when inline is true
         """
         try:
             if not session.get('authenticated'):
@@ -4613,7 +4640,8 @@ def create_app():
             emp_service = EmployeeService(odoo_service)
             doc_service = DocumentService(odoo_service, emp_service)
             doc_service.metrics_service = metrics_service
-            ok_doc, result = doc_service.generate_service_agreement(full_name, private_street=private_street, company_name=company_name)
+            inline = bool(data.get('inline'))
+            ok_doc, result = doc_service.generate_service_agreement(full_name, private_street=private_street, company_name=company_name, inline=inline)
             if ok_doc:
                 extra_meta = {
                     'company_name': company_name,
@@ -4621,6 +4649,8 @@ def create_app():
                     'source': 'rest_api'
                 }
                 _log_document_metric(data.get('thread_id'), 'service_agreement', extra=extra_meta)
+                if inline:
+                    return _inline_document_response(result)
                 return jsonify({'success': True, 'attachment': result})
             else:
                 return jsonify({'success': False, 'message': result}), 500
@@ -4719,6 +4749,10 @@ def create_app():
                         user_ids.add(report_user_id)
                 return True, None, employee_ids, user_ids
 
+            # Owner of an hr.leave record, noted during the ownership check so a successful
+            # approve/refuse can drop that employee's cached leave balance
+            leave_owner_ids = []
+
             def _record_belongs_to_direct_report():
                 ok_reports, report_error, employee_ids, user_ids = _get_fresh_direct_report_ids()
                 if not ok_reports:
@@ -4737,6 +4771,7 @@ def create_app():
                         return False, "Could not verify the time-off request owner"
                     leave_employee_id = _many2one_id(rows[0].get('employee_id'))
                     if leave_employee_id in employee_ids:
+                        leave_owner_ids.append(leave_employee_id)
                         return True, None
                     return False, "This time-off request is not assigned to one of your direct reports"
 
@@ -4806,6 +4841,8 @@ def create_app():
             if 'error' not in result:
                 success_message = f"[ManagerAction] Success: action={action} model={model} record_id={record_id}"
                 debug_log(success_message, "bot_logic")
+                for leave_owner_id in leave_owner_ids:
+                    invalidate_leave_balance(leave_owner_id)
                 try:
                     app.logger.info(success_message)
                 except Exception:
@@ -5165,6 +5202,33 @@ def create_app():
                 'message': f'Error retrieving avatar: {str(e)}'
             }), 500
 
+    @app.route('/api/user/avatar/image', methods=['GET'])
+    def get_user_avatar_image():
+        """Serve the current user's avatar as raw image bytes (no base64/JSON wrapping)."""
+        try:
+            if not session.get('authenticated'):
+                return jsonify({'error': 'Authentication required'}), 401
+
+            ok_img, result = employee_service.get_current_user_avatar_bytes(size=128)
+            if not ok_img:
+                return jsonify({'success': False, 'message': 'No avatar image available'}), 404
+
+            from flask import Response
+            payload, content_type = result
+            return Response(
+                payload,
+                mimetype=content_type,
+                headers={
+                    'Content-Length': str(len(payload)),
+                    'Cache-Control': 'private, max-age=900',
+                },
+            )
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': f'Error retrieving avatar: {str(e)}'
+            }), 500
+
     @app.route('/api/ping', methods=['GET'])
     def ping_session():
         """Lightweight keepalive to keep Odoo session fresh while user is active."""
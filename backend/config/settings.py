@@ -64,6 +64,10 @@ class Config:
     ODOO_USERNAME = os.environ.get("ODOO_USERNAME")
     ODOO_PASSWORD = os.environ.get("ODOO_PASSWORD")
     # User credentials will be provided during login if not supplied via environment
+    # On-disk cache of related Odoo records (departments, companies, partners...)
+    # shared by workers and kept across restarts. It holds personal data, so it
+    # is off unless pointed at an app-owned path; the file is created 0600.
+    ODOO_RELATED_CACHE_PATH = os.environ.get("ODOO_RELATED_CACHE_PATH", "")
 
     # Supabase Configuration
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
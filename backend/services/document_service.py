@@ -1,17 +1,138 @@
+import copy
+import hashlib
+import json
 import os
 import re
+import tempfile
+import threading
+import time
 from datetime import datetime, date
-import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
 from typing import Dict, Tuple, Any, Optional
 
-from docx import Document
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 import logging
 from typing import List
 
+logger = logging.getLogger(__name__)
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Arabic block (basic range) used to detect RTL paragraphs
+_ARABIC_RE = re.compile(r"[\u0600-\u06FF]")
+# WordprocessingML tags walked directly when scanning for placeholders
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_W_P = f'{{{_W_NS}}}p'
+_W_R = f'{{{_W_NS}}}r'
+_W_T = f'{{{_W_NS}}}t'
+# Characters not allowed in filenames on Windows and most filesystems
+_FNAME_BAD = re.compile(r'[\\/:*?"<>|]')
+
+
+@lru_cache(maxsize=32)
+def _placeholder_pattern(placeholders: Tuple[str, ...]):
+    """Compile a single alternation matching any of the given placeholders.
+
+    Longest placeholders come first so overlapping keys resolve to the most
+    specific match. Cached per key set since the same templates reuse them.
+    """
+    ordered = sorted(placeholders, key=len, reverse=True)
+    return re.compile('|'.join(map(re.escape, ordered)))
+
+
+# Background worker for template parsing; lxml releases the GIL while parsing,
+# so a template can load while the Odoo read for the same letter is in flight
+_TEMPLATE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='docx-template')
+
+
+# Parsed templates (path -> (mtime, Document)); renders deep-copy these instead
+# of re-opening the zip and re-parsing every XML part
+_TEMPLATE_CACHE: Dict[str, Tuple[float, Any]] = {}
+_TEMPLATE_CACHE_LOCK = threading.Lock()
+
+
+# Last render written to each output path (filepath -> (render digest, file
+# content digest)), shared process-wide since some routes build a
+# DocumentService per request. Output names are not unique per employee and
+# the directory is shared by workers, so a file is only reused while its
+# content digest still matches. A lock of its own: _TEMPLATE_CACHE_LOCK is
+# held while templates are parsed.
+_RENDERED_DIGESTS: Dict[str, Tuple[str, str]] = {}
+_RENDERED_DIGESTS_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _existing_templates(template_paths: frozenset) -> frozenset:
+    """Subset of template_paths present on disk, checked once per process.
+
+    Templates ship with the deploy, so per-request DocumentService instances
+    share this instead of stat-ing every template again.
+    """
+    return frozenset(p for p in template_paths if os.path.exists(p))
+
+
+def _load_document(template_path: str):
+    """Return a fresh, independently editable Document for template_path.
+
+    Each template is parsed once per process (again if the file changes on
+    disk); callers get a deep copy, which skips decompression and parsing.
+    """
+    # python-docx (and its lxml stack) is only loaded once a letter is rendered
+    from docx import Document
+
+    mtime = os.path.getmtime(template_path)
+    with _TEMPLATE_CACHE_LOCK:
+        cached = _TEMPLATE_CACHE.get(template_path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, Document(template_path))
+            _TEMPLATE_CACHE[template_path] = cached
+        return copy.deepcopy(cached[1])
+
+
+def _pick_template(templates: Tuple[Dict[str, str], str], gender: str) -> str:
+    """Pick from (by gender initial, generic) templates; generic when gender is missing/unknown."""
+    by_gender, template_generic = templates
+    return by_gender.get(gender[:1], template_generic)
+
+
+def _sanitize_filename_part(text: str) -> str:
+    """Replace characters that are not allowed in filenames with '-'."""
+    return _FNAME_BAD.sub('-', str(text or '')).strip()
+
+
+def _content_digest(data) -> str:
+    """Short digest of file bytes, used to recognize a render we wrote."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _save_document(doc, filepath: str) -> str:
+    """Serialize the document in memory, then write it to disk in one call.
+
+    python-docx streams many small zip writes; buffering them in a BytesIO
+    turns that into a single large write. The bytes go to a temp file in the
+    same directory which is then atomically renamed over filepath, so a
+    client downloading the URL never sees a partially written docx.
+    Returns the content digest of the bytes written.
+    """
+    buf = BytesIO()
+    doc.save(buf)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb', buffering=1 << 20) as f:
+            f.write(buf.getbuffer())
+        # mkstemp creates the file as 0600; keep the usual world-readable mode
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return _content_digest(buf.getbuffer())
+
 
 def _format_date_dmy(dt_str: Optional[str]) -> str:
     """Format a date string to DD/MM/YYYY. Accepts ISO (YYYY-MM-DD) or already formatted inputs."""
@@ -33,6 +154,8 @@ def _format_date_dmy(dt_str: Optional[str]) -> str:
 
 
 def _set_paragraph_bidi(paragraph, bidi: bool):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
     try:
         p = paragraph._p
         pPr = p.get_or_add_pPr()
@@ -54,33 +177,38 @@ def _replace_in_paragraph(paragraph, replacements: Dict[str, str]):
     formatting for that paragraph but ensures placeholders are replaced even if
     Word split them across runs for styling.
     """
-    if not paragraph.runs:
+    # paragraph.runs builds fresh Run wrappers on every access; take it once
+    runs = paragraph.runs
+    if not runs or not replacements:
+        return
+
+    combined = ''.join(run.text or '' for run in runs)
+    pattern = _placeholder_pattern(tuple(replacements))
+    if not pattern.search(combined):
         return
-    
+
     # Store original font size from first run (for footer preservation)
     original_font_size = None
-    if paragraph.runs:
-        try:
-            original_font_size = paragraph.runs[0].font.size
-        except:
-            pass
-    
-    combined = ''.join(run.text or '' for run in paragraph.runs)
-    replaced = combined
-    contains_arabic = False
-    for ph, val in replacements.items():
-        if ph in replaced:
-            val_str = val or ''
-            # If value is LTR among Arabic text, add LRM to avoid flipping
-            if re.search(r"[\u0600-\u06FF]", replaced):
-                val_str = _wrap_ltr_for_arabic_context(val_str)
-            replaced = replaced.replace(ph, val_str)
-    # Detect Arabic characters in final text (basic range)
     try:
-        contains_arabic = re.search(r"[\u0600-\u06FF]", replaced) is not None
-    except Exception:
-        contains_arabic = False
+        original_font_size = runs[0].font.size
+    except:
+        pass
+
+    # If value is LTR among Arabic text, add LRM to avoid flipping
+    arabic_context = _ARABIC_RE.search(combined) is not None
+
+    def _substitute(match) -> str:
+        val_str = replacements[match.group(0)] or ''
+        if arabic_context:
+            val_str = _wrap_ltr_for_arabic_context(val_str)
+        return val_str
+
+    replaced = pattern.sub(_substitute, combined)
+    # Detect Arabic characters in final text (basic range)
+    contains_arabic = _ARABIC_RE.search(replaced) is not None
     if replaced != combined:
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
         # Safest way: assign paragraph.text which resets runs internally
         try:
             paragraph.text = replaced
@@ -107,29 +235,39 @@ def _replace_in_paragraph(paragraph, replacements: Dict[str, str]):
                     paragraph.alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
 
-def _replace_in_table(table, replacements: Dict[str, str]):
-    for row in table.rows:
-        for cell in row.cells:
-            _replace_in_block(cell, replacements)
+def _replace_in_block(container, replacements: Dict[str, str]):
+    """Replace placeholders in every paragraph under a document, cell or header/footer.
 
+    Walks the underlying lxml tree for w:p elements (covering tables, text
+    boxes and content controls too) and only wraps a paragraph in a
+    python-docx Paragraph when its run text contains a placeholder, so
+    untouched paragraphs never allocate Paragraph/Run objects. Headers and
+    footers of each section are included when the container is a Document.
+    """
+    if not replacements:
+        return
+    from docx.text.paragraph import Paragraph
 
-def _replace_in_block(container, replacements: Dict[str, str]):
-    # Paragraphs
-    for para in getattr(container, 'paragraphs', []):
-        _replace_in_paragraph(para, replacements)
-    # Tables
-    for table in getattr(container, 'tables', []):
-        _replace_in_table(table, replacements)
+    pattern = _placeholder_pattern(tuple(replacements))
+    stories = [container]
     # Headers/Footers on sections if present
     for section in getattr(container, 'sections', []):
+        for story in ('header', 'footer'):
+            try:
+                stories.append(getattr(section, story))
+            except Exception:
+                pass
+
+    for story in stories:
         try:
-            _replace_in_block(section.header, replacements)
-        except Exception:
-            pass
-        try:
-            _replace_in_block(section.footer, replacements)
+            root = story._element
         except Exception:
-            pass
+            continue
+        # Materialize first: replacing a paragraph's text may drop nested ones
+        for p in list(root.iter(_W_P)):
+            text = ''.join(t.text or '' for r in p.iterchildren(_W_R) for t in r.iterchildren(_W_T))
+            if text and pattern.search(text):
+                _replace_in_paragraph(Paragraph(p, story), replacements)
 
 
 def _replace_country_fuzzy(container, country_value: str):
@@ -151,9 +289,10 @@ def _replace_country_fuzzy(container, country_value: str):
 
         # Paragraphs
         for para in getattr(container, 'paragraphs', []):
-            if para.text and pattern.search(para.text):
+            text = para.text
+            if text and pattern.search(text):
                 # Replace on combined text; preserve simple formatting by resetting text
-                para.text = _apply(para.text)
+                para.text = _apply(text)
         # Tables
         for table in getattr(container, 'tables', []):
             for row in table.rows:
@@ -180,8 +319,9 @@ def _count_country_placeholders(container) -> int:
         count = 0
         for para in getattr(container, 'paragraphs', []):
             try:
-                if para.text and pattern.search(para.text):
-                    count += len(pattern.findall(para.text))
+                text = para.text
+                if text:
+                    count += len(pattern.findall(text))
             except Exception:
                 continue
         for table in getattr(container, 'tables', []):
@@ -202,7 +342,7 @@ def _count_country_placeholders(container) -> int:
         return 0
 
 
-def _xml_force_replace_country(doc: Document, country_value: str) -> None:
+def _xml_force_replace_country(doc: "Document", country_value: str) -> None:
     """Aggressively replace '(Country)' inside XML textboxes and any w:t nodes.
 
     This handles cases where content resides inside shapes/textboxes (w:txbxContent)
@@ -215,6 +355,8 @@ def _xml_force_replace_country(doc: Document, country_value: str) -> None:
       for simple cases.
     Note: This may drop fine-grained formatting inside those paragraphs, by design.
     """
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
     try:
         if not country_value:
             return
@@ -229,7 +371,7 @@ def _xml_force_replace_country(doc: Document, country_value: str) -> None:
             for p in txbx.xpath('.//w:p', namespaces=ns):
                 # Collect all texts in order
                 t_nodes: List = p.xpath('.//w:r/w:t', namespaces=ns)
-                combined = ''.join([t.text or '' for t in t_nodes])
+                combined = ''.join(t.text or '' for t in t_nodes)
                 if not combined:
                     continue
                 if not pattern.search(combined):
@@ -253,7 +395,7 @@ def _xml_force_replace_country(doc: Document, country_value: str) -> None:
             t_nodes: List = p.xpath('.//w:r/w:t', namespaces=ns)
             if not t_nodes:
                 continue
-            combined = ''.join([t.text or '' for t in t_nodes])
+            combined = ''.join(t.text or '' for t in t_nodes)
             if not combined or not pattern.search(combined):
                 continue
             replaced = pattern.sub(country_value, combined)
@@ -282,62 +424,6 @@ def _xml_force_replace_country(doc: Document, country_value: str) -> None:
         pass
 
 
-def _zip_force_replace_country(docx_path: str, country_value: str) -> None:
-    """Open a saved .docx and replace '(Country)' variants across XML parts.
-
-    This is a last-resort approach that ensures replacements even if content lives in
-    uncommon containers not traversed by python-docx. It scans these parts:
-    - word/document.xml, word/header*.xml, word/footer*.xml
-    """
-    try:
-        print(f"[ZIP_REPLACE] Starting with path='{docx_path}', country='{country_value}'")
-        if not (docx_path and country_value and os.path.exists(docx_path)):
-            print(f"[ZIP_REPLACE] Validation failed: path={bool(docx_path)}, country={bool(country_value)}, exists={os.path.exists(docx_path) if docx_path else False}")
-            return
-        ws = r"[ \t\r\n\u00A0\u2007\u202F\u2009\u200A\u200B\u2060\uFEFF]*"
-        pattern = re.compile(rf"\({ws}C{ws}o{ws}u{ws}n{ws}t{ws}r{ws}y{ws}\)", flags=re.IGNORECASE)
-        print(f"[ZIP_REPLACE] Pattern compiled successfully")
-
-        replacements_made = 0
-        with zipfile.ZipFile(docx_path, 'r') as zin:
-            out_buf = BytesIO()
-            with zipfile.ZipFile(out_buf, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
-                for item in zin.infolist():
-                    data = zin.read(item.filename)
-                    if item.filename.startswith('word/') and (
-                        item.filename == 'word/document.xml' or
-                        item.filename.startswith('word/header') or
-                        item.filename.startswith('word/footer')
-                    ):
-                        try:
-                            xml_text = data.decode('utf-8')
-                            before_count = len(pattern.findall(xml_text))
-                            if before_count > 0:
-                                print(f"[ZIP_REPLACE] Found {before_count} placeholder(s) in {item.filename}")
-                            xml_text = pattern.sub(country_value, xml_text)
-                            after_count = len(pattern.findall(xml_text))
-                            if before_count > 0:
-                                print(f"[ZIP_REPLACE] After replacement: {after_count} placeholder(s) remain in {item.filename}")
-                                replacements_made += (before_count - after_count)
-                            zout.writestr(item, xml_text.encode('utf-8'))
-                        except Exception as e:
-                            print(f"[ZIP_REPLACE] Failed to process {item.filename}: {e}")
-                            # Keep original if decode fails
-                            zout.writestr(item, data)
-                            continue
-                    else:
-                        # Copy unchanged
-                        zout.writestr(item, data)
-            # Overwrite original file
-            with open(docx_path, 'wb') as f:
-                f.write(out_buf.getvalue())
-        print(f"[ZIP_REPLACE] Completed. Total replacements made: {replacements_made}")
-    except Exception as e:
-        print(f"[ZIP_REPLACE] Exception occurred: {e}")
-        # Never raise; this is a best-effort pass
-        pass
-
-
 def _contains_latin_or_digits(text: str) -> bool:
     if not text:
         return False
@@ -363,6 +449,7 @@ def _force_container_rtl(container) -> None:
     Applied for Arabic documents to ensure consistent RTL layout, even for
     paragraphs that end up containing only LTR characters after replacement.
     """
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
     for para in getattr(container, 'paragraphs', []):
         _set_paragraph_bidi(para, True)
         try:
@@ -496,6 +583,35 @@ class DocumentService:
             'Prezlab Digital Design Firm L.L.C. - O.P.C': os.path.join(templates_root, "Abu Dhabi Service Agreement - (Prezlab Digital Design Firm).docx"),
         }
 
+        # Template choice per letter: ({gender initial: template}, generic fallback)
+        self._employment_templates = ({'f': self.template_female, 'm': self.template_male}, self.template_generic_en)
+        self._employment_templates_ar = ({'f': self.template_ar_female, 'm': self.template_ar_male}, self.template_generic_ar)
+        self._experience_templates = ({'f': self.template_experience_female, 'm': self.template_experience_male}, self.template_experience_generic)
+        self._embassy_templates = ({'f': self.template_embassy_female, 'm': self.template_embassy_male}, self.template_embassy_generic)
+
+        # Templates ship with the deploy: which ones exist is checked once per process
+        template_paths = frozenset({
+            self.template_male, self.template_female,
+            self.template_ar_male, self.template_ar_female,
+            self.template_generic_en, self.template_generic_ar,
+            self.template_embassy_male, self.template_embassy_female, self.template_embassy_generic,
+            self.template_experience_male, self.template_experience_female, self.template_experience_generic,
+            self.template_service_agreement, *self.template_service_agreement_map.values(),
+        })
+        self._valid_templates = _existing_templates(template_paths)
+
+        # Short-lived cache of employee/company reads so back-to-back letter
+        # generations (employment + experience + embassy) reuse the same data.
+        # employee_id -> (timestamp, session_id, emp_fields, comp_fields, employee, company)
+        self._emp_cache: Dict[int, Tuple[float, Any, frozenset, frozenset, Dict, Dict]] = {}
+        self._emp_cache_ttl = 30  # seconds
+        # LRU of base replacement dicts keyed by record versions, language and day
+        self._replacements_cache: "OrderedDict[tuple, Dict[str, str]]" = OrderedDict()
+        self._replacements_cache_size = 64
+        # Gender last seen per employee, used to start parsing the likely
+        # template in the background while the employee read is in flight
+        self._gender_hint: Dict[int, str] = {}
+
     def _ensure_downloads_dir(self):
         os.makedirs(self.downloads_dir, exist_ok=True)
         os.makedirs(self.embassy_downloads_dir, exist_ok=True)
@@ -513,7 +629,158 @@ class DocumentService:
         }
         return self.employee_service._make_odoo_request('res.company', 'read', params)
 
+    def _read_employee_and_company(self, employee_id: int, emp_fields: list, comp_fields: list) -> Tuple[bool, Any]:
+        """Cached wrapper around _fetch_employee_and_company.
+
+        Entries expire after a short TTL, are tied to the Odoo session that
+        produced them, and are only reused when they cover the requested fields.
+        """
+        session_id = getattr(self.odoo_service, 'session_id', None)
+        cached = self._emp_cache.get(employee_id)
+        if cached:
+            ts, cached_session, cached_emp_fields, cached_comp_fields, employee, company = cached
+            if (cached_session == session_id
+                    and time.monotonic() - ts < self._emp_cache_ttl
+                    and cached_emp_fields.issuperset(emp_fields)
+                    and cached_comp_fields.issuperset(comp_fields)):
+                return True, (dict(employee), dict(company))
+            self._emp_cache.pop(employee_id, None)
+
+        ok, records = self._fetch_employee_and_company(employee_id, emp_fields, comp_fields)
+        if ok:
+            employee, company = records
+            self._emp_cache[employee_id] = (
+                time.monotonic(), session_id, frozenset(emp_fields), frozenset(comp_fields),
+                dict(employee), dict(company)
+            )
+        return ok, records
+
+    def _fetch_employee_and_company(self, employee_id: int, emp_fields: list, comp_fields: list) -> Tuple[bool, Any]:
+        """Read employee fields and the linked company record in a single RPC.
+
+        Uses ``web_read`` with a nested specification on ``company_id`` so the
+        company comes back inline. Many2one values are normalized to the
+        ``[id, name]`` shape returned by ``read``. Falls back to separate
+        employee/company reads (with AccessError field handling) when
+        ``web_read`` is unavailable or fails.
+
+        Returns (True, (employee, company)) or (False, error message).
+        """
+        specification = {field: {'fields': {'display_name': {}}} for field in emp_fields}
+        specification['company_id'] = {'fields': {field: {} for field in comp_fields}}
+        params = {
+            'args': [[employee_id]],
+            'kwargs': {'specification': specification}
+        }
+        ok, data = self.employee_service._make_odoo_request('hr.employee', 'web_read', params)
+        if ok and isinstance(data, list) and data:
+            employee = dict(data[0])
+            company = employee.get('company_id')
+            for field, value in employee.items():
+                if isinstance(value, dict) and 'id' in value:
+                    employee[field] = [value['id'], value.get('display_name') or value.get('name') or '']
+            if not isinstance(company, dict) or not company.get('id'):
+                return False, 'Company not found for employee'
+            return True, (employee, company)
+
+        # Fallback: separate employee and company reads
+        ok, emp_read = self._read_employee_with_fields(employee_id, emp_fields)
+        if not ok or not emp_read:
+            return False, f'Failed to read employee fields: {emp_read}'
+        employee = emp_read[0] if isinstance(emp_read, list) else emp_read
+
+        # Resolve company id
+        company_id = None
+        comp_val = employee.get('company_id')
+        if isinstance(comp_val, list) and comp_val:
+            company_id = comp_val[0]
+        elif isinstance(comp_val, int):
+            company_id = comp_val
+        if not company_id:
+            return False, 'Company not found for employee'
+
+        ok, comp_read = self._read_company_with_fields(company_id, comp_fields)
+        if not ok or not comp_read:
+            return False, f'Failed to read company fields: {comp_read}'
+        company = comp_read[0] if isinstance(comp_read, list) else comp_read
+        return True, (employee, company)
+
+    def _render_to_file(self, template_path: str, replacements: Dict[str, str], filepath: str,
+                        rtl: bool = False, doc_future: Optional[Future] = None) -> None:
+        """Render a template with replacements into filepath.
+
+        Renders are deterministic for a given template and mapping, so when the
+        file on disk came from an identical render (its content is still what
+        was written, and it is newer than the template) it is reused as-is. doc_future, when given, is a background
+        parse of template_path started earlier by the caller.
+        """
+        payload = json.dumps([template_path, rtl, replacements], sort_keys=True, ensure_ascii=False)
+        digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+        with _RENDERED_DIGESTS_LOCK:
+            last = _RENDERED_DIGESTS.get(filepath)
+        if last is not None and last[0] == digest:
+            try:
+                if os.path.getmtime(filepath) >= os.path.getmtime(template_path):
+                    # Another worker may have rendered a different letter to this name
+                    with open(filepath, 'rb') as f:
+                        if _content_digest(f.read()) == last[1]:
+                            return
+            except OSError:
+                pass
+
+        doc = self._render_document(template_path, replacements, rtl=rtl, doc_future=doc_future)
+        content_digest = _save_document(doc, filepath)
+        with _RENDERED_DIGESTS_LOCK:
+            _RENDERED_DIGESTS[filepath] = (digest, content_digest)
+
+    def _render_to_bytes(self, template_path: str, replacements: Dict[str, str],
+                         rtl: bool = False, doc_future: Optional[Future] = None) -> bytes:
+        """Render a template with replacements and return the .docx bytes without touching disk."""
+        doc = self._render_document(template_path, replacements, rtl=rtl, doc_future=doc_future)
+        buf = BytesIO()
+        doc.save(buf)
+        return buf.getvalue()
+
+    @staticmethod
+    def _render_document(template_path: str, replacements: Dict[str, str],
+                         rtl: bool = False, doc_future: Optional[Future] = None):
+        """Load template_path (or take the prefetched parse) and apply replacements."""
+        doc = doc_future.result() if doc_future is not None else _load_document(template_path)
+        # For Arabic docs, force container RTL before and after replacements
+        if rtl:
+            _force_container_rtl(doc)
+        _replace_in_block(doc, replacements)
+        if rtl:
+            _force_container_rtl(doc)
+        return doc
+
     def _build_replacements(self, employee: Dict, company: Dict, lang: str = 'en') -> Dict[str, str]:
+        """Return the base placeholder mapping, memoized per record version.
+
+        The key includes both records' write_date so edits in Odoo invalidate
+        the entry, and today's date because (Current Date) is part of the
+        mapping. Records read without write_date are never cached. Callers
+        receive a copy they are free to extend.
+        """
+        emp_version = employee.get('write_date')
+        comp_version = company.get('write_date')
+        if not (emp_version and comp_version):
+            return self._compute_replacements(employee, company, lang=lang)
+
+        key = (employee.get('id'), emp_version, company.get('id'), comp_version,
+               (lang or 'en').lower(), date.today())
+        cached = self._replacements_cache.get(key)
+        if cached is not None:
+            self._replacements_cache.move_to_end(key)
+            return dict(cached)
+
+        replacements = self._compute_replacements(employee, company, lang=lang)
+        self._replacements_cache[key] = dict(replacements)
+        while len(self._replacements_cache) > self._replacements_cache_size:
+            self._replacements_cache.popitem(last=False)
+        return replacements
+
+    def _compute_replacements(self, employee: Dict, company: Dict, lang: str = 'en') -> Dict[str, str]:
         current_date = date.today().strftime('%d/%m/%Y')
 
         joining_date_raw = employee.get('x_studio_joining_date')
@@ -564,13 +831,19 @@ class DocumentService:
             replacements['(الاسم الكامل)'] = arabic_full_name
         return replacements
 
-    def generate_employment_letter(self, lang: str = 'en') -> Tuple[bool, Any]:
-        """Generate an Employment Letter for the current user and return metadata including file URL."""
-        # Ensure active Odoo session
-        session_ok, session_msg = self.odoo_service.ensure_active_session()
-        if not session_ok:
-            return False, f'Odoo session error: {session_msg}'
-
+    def _generate_letter(self, doc_type_display: str, templates: Tuple[Dict[str, str], str],
+                         downloads_dir: str, url_subdir: str, lang: str = 'en',
+                         extra_replacements: Optional[Dict[str, str]] = None,
+                         inline: bool = False) -> Tuple[bool, Any]:
+        """Shared pipeline for letters about the current user.
+
+        Resolves the current employee and company, picks the template for the
+        employee's gender from templates=({gender initial: path}, generic), builds the
+        placeholder mapping (plus any letter-specific extras), renders it into
+        downloads_dir as "[doc type] - [person name].docx" and returns
+        attachment metadata. With inline=True nothing is written; the metadata
+        carries the document under 'bytes' instead of a 'file_url'.
+        """
         # Get current user's employee data to find employee id
         emp_ok, emp_data = self.employee_service.get_current_user_employee_data()
         if not emp_ok or not emp_data:
@@ -580,95 +853,88 @@ class DocumentService:
         if not employee_id:
             return False, 'Employee ID not found for current user'
 
-        # Read required employee fields (ensures custom fields are fetched reliably)
-        emp_fields = ['name', 'gender', 'x_studio_rf_gender', 'job_title', 'department_id', 'company_id', 'x_studio_joining_date', 'x_studio_work_location_country', 'x_studio_employee_arabic_name']
-        ok, emp_read = self._read_employee_with_fields(employee_id, emp_fields)
-        if not ok or not emp_read:
-            return False, f'Failed to read employee fields: {emp_read}'
-        employee = emp_read[0] if isinstance(emp_read, list) else emp_read
-
-        # Resolve company id
-        company_id = None
-        comp_val = employee.get('company_id')
-        if isinstance(comp_val, list) and comp_val:
-            company_id = comp_val[0]
-        elif isinstance(comp_val, int):
-            company_id = comp_val
+        # If we already know this employee's gender and the read below has to
+        # go to Odoo, parse the template they will most likely get meanwhile
+        prefetch_path, prefetch = None, None
+        hint = self._gender_hint.get(employee_id)
+        cached = self._emp_cache.get(employee_id)
+        read_is_cached = cached is not None and time.monotonic() - cached[0] < self._emp_cache_ttl
+        if hint is not None and not read_is_cached:
+            prefetch_path = _pick_template(templates, hint)
+            if prefetch_path in self._valid_templates:
+                prefetch = _TEMPLATE_EXECUTOR.submit(_load_document, prefetch_path)
+
+        # Read required employee and company fields (ensures custom fields are fetched reliably)
+        emp_fields = ['name', 'gender', 'x_studio_rf_gender', 'job_title', 'department_id', 'company_id', 'x_studio_joining_date', 'x_studio_work_location_country', 'x_studio_employee_arabic_name', 'write_date']
+        comp_fields = ['name', 'street', 'company_registry', 'arabic_name', 'write_date']
+        ok, records = self._read_employee_and_company(employee_id, emp_fields, comp_fields)
+        if not ok:
+            return False, records
+        employee, company = records
 
-        if not company_id:
-            return False, 'Company not found for employee'
-
-        # Read required company fields
-        comp_fields = ['name', 'street', 'company_registry', 'arabic_name']
-        ok, comp_read = self._read_company_with_fields(company_id, comp_fields)
-        if not ok or not comp_read:
-            return False, f'Failed to read company fields: {comp_read}'
-        company = comp_read[0] if isinstance(comp_read, list) else comp_read
-
-        # Choose template based on gender and language; use generic fallback when gender missing/unknown
+        # Choose template by gender with generic fallback when gender missing/unknown
         gender_raw = (employee.get('gender') or '').strip()
         if not gender_raw:
             gender_raw = str(employee.get('x_studio_rf_gender') or '').strip()
         gender = gender_raw.lower()
-        is_female = gender.startswith('f')
-        is_male = gender.startswith('m')
-        if (lang or 'en').lower().startswith('ar'):
-            if is_female:
-                template_path = self.template_ar_female
-            elif is_male:
-                template_path = self.template_ar_male
-            else:
-                template_path = self.template_generic_ar
-        else:
-            if is_female:
-                template_path = self.template_female
-            elif is_male:
-                template_path = self.template_male
-            else:
-                template_path = self.template_generic_en
-        if not os.path.exists(template_path):
+        self._gender_hint[employee_id] = gender
+        template_path = _pick_template(templates, gender)
+        if template_path not in self._valid_templates:
             return False, f'Template not found: {template_path}'
+        doc_future = prefetch if prefetch_path == template_path else None
 
-        # Prepare replacements
+        # Prepare replacements (base mapping plus letter-specific placeholders)
         replacements = self._build_replacements(employee, company, lang=lang)
-
-        # Load, replace, and save document
-        doc = Document(template_path)
-        # For Arabic docs, force container RTL before and after replacements
-        if (lang or 'en').lower().startswith('ar'):
-            _force_container_rtl(doc)
-        _replace_in_block(doc, replacements)
-        if (lang or 'en').lower().startswith('ar'):
-            _force_container_rtl(doc)
-
-        # Ensure downloads dir exists
-        self._ensure_downloads_dir()
+        if extra_replacements:
+            replacements.update(extra_replacements)
 
         # Build filename in the format: "[doc type] - [person name].docx"
-        # Example: "Arabic Employment Letter - Omar basem elhasan.docx"
-        def _sanitize_filename_part(text: str) -> str:
-            # Remove characters not allowed in filenames on Windows and most filesystems
-            return re.sub(r'[\\\\/:*?"<>|]', '-', text).strip()
-
+        # Example: "arabic employment letter - Omar basem elhasan.docx"
         person_name_display = employee.get('name') or 'Employee'
-        is_ar = (lang or 'en').lower().startswith('ar')
-        doc_type_display = 'arabic employment letter' if is_ar else 'employment letter'
         filename = f"{_sanitize_filename_part(doc_type_display)} - {_sanitize_filename_part(person_name_display)}.docx"
-        filepath = os.path.join(self.downloads_dir, filename)
-        doc.save(filepath)
+        is_ar = (lang or 'en').lower().startswith('ar')
 
-        # Build URL relative to Flask static
-        file_url = f"/static/downloads/employment_letters/{filename}"
+        if inline:
+            return True, {
+                'file_name': filename,
+                'bytes': self._render_to_bytes(template_path, replacements, rtl=is_ar, doc_future=doc_future),
+                'mime_type': DOCX_MIME_TYPE
+            }
 
+        # Ensure directories exist
+        self._ensure_downloads_dir()
+        filepath = os.path.join(downloads_dir, filename)
+
+        # Load, replace, and save document
+        self._render_to_file(template_path, replacements, filepath, rtl=is_ar, doc_future=doc_future)
+
+        # Build URL relative to Flask static
+        file_url = f"/static/downloads/{url_subdir}/{filename}"
         return True, {
             'file_name': filename,
             'file_url': file_url,
-            'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            'mime_type': DOCX_MIME_TYPE
         }
 
-    def generate_service_agreement(self, full_name: str, private_street: str = '', company_name: str = '') -> Tuple[bool, Any]:
+    def generate_employment_letter(self, lang: str = 'en', inline: bool = False) -> Tuple[bool, Any]:
+        """Generate an Employment Letter for the current user and return metadata including file URL."""
+        if (lang or 'en').lower().startswith('ar'):
+            templates = self._employment_templates_ar
+            doc_type_display = 'arabic employment letter'
+        else:
+            templates = self._employment_templates
+            doc_type_display = 'employment letter'
+        return self._generate_letter(
+            doc_type_display, templates, self.downloads_dir, 'employment_letters', lang=lang, inline=inline,
+        )
+
+    def generate_service_agreement(self, full_name: str, private_street: str = '', company_name: str = '',
+                                   inline: bool = False) -> Tuple[bool, Any]:
         """Generate a Service Agreement using the provided template and return attachment metadata.
 
+        With inline=True the document is returned under 'bytes' instead of being
+        written to the service agreements folder.
+
         Placeholders replaced:
         - (First and Last Name)
         - (Current Date)
@@ -678,224 +944,73 @@ class DocumentService:
             # Note: Backward compatibility – if caller doesn't pass company_name, default mapping uses Jordan template
             company_name = locals().get('company_name', '')  # will be injected via updated signature below
             template_path = self.template_service_agreement_map.get(str(company_name).strip(), self.template_service_agreement)
-            if not os.path.exists(template_path):
+            if template_path not in self._valid_templates:
                 return False, f"Template not found: {template_path}"
 
-            self._ensure_downloads_dir()
-
-            today_str = date.today().strftime('%d/%m/%Y')
+            # Compute today once so the placeholder and filename always agree (even around midnight)
+            today = date.today()
+            today_dmy = today.strftime('%d/%m/%Y')
+            today_ymd = today.strftime('%Y%m%d')
             replacements = {
                 '(First and Last Name)': str(full_name or '').strip(),
-                '(Current Date)': today_str,
+                '(Current Date)': today_dmy,
             }
 
-            doc = Document(template_path)
             # Include optional Private Street placeholder if provided
             if private_street:
                 replacements['(Private Street)'] = str(private_street)
-            _replace_in_block(doc, replacements)
 
             # Filename: Service_Agreement_[Name]_[YYYYMMDD].docx
-            def _sanitize_filename_part(text: str) -> str:
-                import re as _re
-                return _re.sub(r'[\\/:*?"<>|]', '-', str(text or '')).strip()
+            filename = f"Service_Agreement_{_sanitize_filename_part(full_name)}_{today_ymd}.docx"
+            if inline:
+                return True, {
+                    'file_name': filename,
+                    'bytes': self._render_to_bytes(template_path, replacements),
+                    'mime_type': DOCX_MIME_TYPE
+                }
 
-            filename = f"Service_Agreement_{_sanitize_filename_part(full_name)}_{date.today().strftime('%Y%m%d')}.docx"
+            self._ensure_downloads_dir()
             filepath = os.path.join(self.service_downloads_dir, filename)
-            doc.save(filepath)
+            self._render_to_file(template_path, replacements, filepath)
 
             file_url = f"/static/downloads/service_agreements/{filename}"
             return True, {
                 'file_name': filename,
                 'file_url': file_url,
-                'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+                'mime_type': DOCX_MIME_TYPE
             }
         except Exception as e:
             return False, f"Service agreement generation error: {e}"
 
-    def generate_experience_letter(self) -> Tuple[bool, Any]:
+    def generate_experience_letter(self, inline: bool = False) -> Tuple[bool, Any]:
         """Generate an Experience Letter for the current user and return metadata including file URL."""
-        # Ensure active Odoo session
-        session_ok, session_msg = self.odoo_service.ensure_active_session()
-        if not session_ok:
-            return False, f'Odoo session error: {session_msg}'
-
-        # Get current user's employee data to find employee id
-        emp_ok, emp_data = self.employee_service.get_current_user_employee_data()
-        if not emp_ok or not emp_data:
-            return False, f'Could not fetch employee data: {emp_data}'
-
-        employee_id = emp_data.get('id')
-        if not employee_id:
-            return False, 'Employee ID not found for current user'
-
-        # Read required employee fields (extend if templates require more)
-        emp_fields = ['name', 'gender', 'x_studio_rf_gender', 'job_title', 'department_id', 'company_id', 'x_studio_joining_date', 'x_studio_work_location_country', 'x_studio_employee_arabic_name']
-        ok, emp_read = self._read_employee_with_fields(employee_id, emp_fields)
-        if not ok or not emp_read:
-            return False, f'Failed to read employee fields: {emp_read}'
-        employee = emp_read[0] if isinstance(emp_read, list) else emp_read
-
-        # Resolve company id
-        company_id = None
-        comp_val = employee.get('company_id')
-        if isinstance(comp_val, list) and comp_val:
-            company_id = comp_val[0]
-        elif isinstance(comp_val, int):
-            company_id = comp_val
-        if not company_id:
-            return False, 'Company not found for employee'
-
-        # Read required company fields
-        comp_fields = ['name', 'street', 'company_registry', 'arabic_name']
-        ok, comp_read = self._read_company_with_fields(company_id, comp_fields)
-        if not ok or not comp_read:
-            return False, f'Failed to read company fields: {comp_read}'
-        company = comp_read[0] if isinstance(comp_read, list) else comp_read
-
-        # Choose template by gender with generic fallback when gender missing/unknown
-        gender_raw = (employee.get('gender') or '').strip()
-        if not gender_raw:
-            gender_raw = str(employee.get('x_studio_rf_gender') or '').strip()
-        gender = gender_raw.lower()
-        is_female = gender.startswith('f')
-        is_male = gender.startswith('m')
-        if is_female:
-            template_path = self.template_experience_female
-        elif is_male:
-            template_path = self.template_experience_male
-        else:
-            template_path = self.template_experience_generic
-        if not os.path.exists(template_path):
-            return False, f'Template not found: {template_path}'
-
-        # Prepare replacements using base mapping
-        replacements = self._build_replacements(employee, company, lang='en')
-
-        # Build document
-        doc = Document(template_path)
-        _replace_in_block(doc, replacements)
-
-        # Ensure directories exist
-        self._ensure_downloads_dir()
-
-        # Filename: "experience letter - Name.docx"
-        def _sanitize_filename_part(text: str) -> str:
-            return re.sub(r'[\\/:*?"<>|]', '-', text).strip()
-
-        person_name_display = employee.get('name') or 'Employee'
-        filename = f"experience letter - {_sanitize_filename_part(person_name_display)}.docx"
-        filepath = os.path.join(self.experience_downloads_dir, filename)
-        doc.save(filepath)
-
-        file_url = f"/static/downloads/experience_letters/{filename}"
-        return True, {
-            'file_name': filename,
-            'file_url': file_url,
-            'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        }
-
-    def generate_embassy_letter(self, country: str, start_date: str, end_date: str) -> Tuple[bool, Any]:
+        return self._generate_letter(
+            'experience letter',
+            self._experience_templates,
+            self.experience_downloads_dir, 'experience_letters', inline=inline,
+        )
+
+    def generate_embassy_letter(self, country: str, start_date: str, end_date: str,
+                                inline: bool = False) -> Tuple[bool, Any]:
         """Generate an Employment Letter to Embassies with country and date range placeholders."""
-        print(f"[EMBASSY] generate_embassy_letter called with country='{country}', start_date='{start_date}', end_date='{end_date}'")
-        # Ensure active Odoo session
-        session_ok, session_msg = self.odoo_service.ensure_active_session()
-        if not session_ok:
-            return False, f'Odoo session error: {session_msg}'
-
-        # Fetch current user employee data
-        emp_ok, emp_data = self.employee_service.get_current_user_employee_data()
-        if not emp_ok or not emp_data:
-            return False, f'Could not fetch employee data: {emp_data}'
-
-        employee_id = emp_data.get('id')
-        if not employee_id:
-            return False, 'Employee ID not found for current user'
-
-        # Read required employee fields
-        emp_fields = ['name', 'gender', 'x_studio_rf_gender', 'job_title', 'department_id', 'company_id', 'x_studio_joining_date', 'x_studio_work_location_country', 'x_studio_employee_arabic_name']
-        ok, emp_read = self._read_employee_with_fields(employee_id, emp_fields)
-        if not ok or not emp_read:
-            return False, f'Failed to read employee fields: {emp_read}'
-        employee = emp_read[0] if isinstance(emp_read, list) else emp_read
-
-        # Resolve company
-        company_id = None
-        comp_val = employee.get('company_id')
-        if isinstance(comp_val, list) and comp_val:
-            company_id = comp_val[0]
-        elif isinstance(comp_val, int):
-            company_id = comp_val
-        if not company_id:
-            return False, 'Company not found for employee'
-
-        comp_fields = ['name', 'street', 'company_registry', 'arabic_name']
-        ok, comp_read = self._read_company_with_fields(company_id, comp_fields)
-        if not ok or not comp_read:
-            return False, f'Failed to read company fields: {comp_read}'
-        company = comp_read[0] if isinstance(comp_read, list) else comp_read
-
-        # Choose template by gender with generic fallback when gender missing/unknown
-        gender_raw = (employee.get('gender') or '').strip()
-        if not gender_raw:
-            gender_raw = str(employee.get('x_studio_rf_gender') or '').strip()
-        gender = gender_raw.lower()
-        is_female = gender.startswith('f')
-        is_male = gender.startswith('m')
-        if is_female:
-            template_path = self.template_embassy_female
-        elif is_male:
-            template_path = self.template_embassy_male
-        else:
-            template_path = self.template_embassy_generic
-        if not os.path.exists(template_path):
-            return False, f'Template not found: {template_path}'
-
-        # Prepare replacements (start with base then add embassy placeholders)
-        replacements = self._build_replacements(employee, company, lang='en')
-        replacements.update({
+        logger.debug("[EMBASSY] generate_embassy_letter called with country=%r, start_date=%r, end_date=%r", country, start_date, end_date)
+        extra = {
             '(Start Date)': _format_date_dmy(start_date),
             '(End Date)': _format_date_dmy(end_date)
-        })
+        }
         # Only replace (Country) if a country was explicitly provided; otherwise leave the placeholder in the template
         country_display = (country or '').strip()
-        print(f"[EMBASSY] country_display after strip: '{country_display}'")
         if country_display:
-            replacements['(Country)'] = country_display
-            print(f"[EMBASSY] Added '(Country)' -> '{country_display}' to replacements")
+            extra['(Country)'] = country_display
+            logger.debug("[EMBASSY] Replacing (Country) with %r", country_display)
         else:
-            print(f"[EMBASSY] WARNING: country_display is empty, not replacing (Country)")
-
-        # Build document
-        doc = Document(template_path)
-        print(f"[EMBASSY] Calling _replace_in_block with {len(replacements)} replacements")
-        _replace_in_block(doc, replacements)
-
-        # Ensure directories exist
-        self._ensure_downloads_dir()
-
-        # Filename: "embassy employment letter - Name.docx"
-        def _sanitize_filename_part(text: str) -> str:
-            return re.sub(r'[\\/:*?"<>|]', '-', text).strip()
-
-        person_name_display = employee.get('name') or 'Employee'
-        filename = f"embassy employment letter - {_sanitize_filename_part(person_name_display)}.docx"
-        filepath = os.path.join(self.embassy_downloads_dir, filename)
-        print(f"[EMBASSY] Saving document to: {filepath}")
-        doc.save(filepath)
-        # Final safety: zip-level pass over XML parts
-        if country_display:
-            print(f"[EMBASSY] Calling _zip_force_replace_country with country='{country_display}'")
-            _zip_force_replace_country(filepath, country_display)
-            print(f"[EMBASSY] _zip_force_replace_country completed")
-        else:
-            print(f"[EMBASSY] Skipping zip replacement because country_display is empty")
-
-        file_url = f"/static/downloads/embassy_letters/{filename}"
-        return True, {
-            'file_name': filename,
-            'file_url': file_url,
-            'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        }
+            logger.debug("[EMBASSY] No country provided; leaving (Country) placeholder in place")
+
+        return self._generate_letter(
+            'embassy employment letter',
+            self._embassy_templates,
+            self.embassy_downloads_dir, 'embassy_letters', extra_replacements=extra,
+            inline=inline,
+        )
 
 
@@ -1,39 +1,179 @@
-import requests
+import base64
+import hashlib
 import json
-from typing import Dict, List, Optional, Tuple, Any
-from datetime import datetime, timedelta
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from datetime import timedelta
 import logging
 try:
     from ..config.settings import Config
 except Exception:
     from config.settings import Config
+try:
+    from .odoo_service import JSON_HEADERS, json_dumps, json_loads
+except Exception:
+    from services.odoo_service import JSON_HEADERS, json_dumps, json_loads
+
+# Field names listed in Odoo AccessError messages ("- field (allowed for ...)")
+_FIELD_NAME_RE = re.compile(r'^[a-zA-Z0-9_]+$')
+_FIELD_TOKEN_SEP_RE = re.compile(r'[ (]')
+
+def debug_log(message: str, category: str = "general", *args):
+    """Conditional debug logging based on configuration.
+
+    Extra args are %-interpolated into message only when the category is
+    enabled, so large payloads are never formatted when logging is off.
+    """
+    if category == "odoo_data":
+        enabled = Config.DEBUG_ODOO_DATA
+    elif category == "bot_logic":
+        enabled = Config.DEBUG_BOT_LOGIC
+    elif category == "general":
+        enabled = Config.VERBOSE_LOGS
+    else:
+        enabled = False
+    if enabled:
+        print(f"DEBUG: {message % args if args else message}")
+
+def _sniff_image_mime(data_bytes: bytes) -> str:
+    """Guess an image MIME type from its leading bytes (JPEG when unknown)."""
+    head = data_bytes[:16]
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data_bytes[:4] == b'RIFF' and data_bytes[8:12] == b'WEBP':
+        return 'image/webp'
+    trimmed = data_bytes.lstrip()
+    if trimmed.startswith(b'<?xml') or trimmed.startswith(b'<svg'):
+        return 'image/svg+xml'
+    return 'image/jpeg'
+
+# Worker threads for per-model related-record reads, shared by every request
+# in the process (bounded so a burst of requests cannot overwhelm Odoo)
+_RELATED_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=6, thread_name_prefix='odoo-related')
+
+
+class _RelatedRecordDiskCache:
+    """SQLite-backed (model, id) -> record store with per-entry expiry.
+
+    Sits behind the in-memory related cache so records that almost never
+    change survive worker restarts and are shared by all workers on the host.
+    Values are stored as JSON. Any database error disables the store for the
+    rest of the process; it is only ever an optimization.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.enabled = bool(path)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Records include personal data: owner-only file (SQLite gives its
+            # -wal/-shm files the same mode); loosened modes are tightened
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            if os.stat(self.path).st_mode & 0o077:
+                os.chmod(self.path, 0o600)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS related_cache ('
+                'key TEXT PRIMARY KEY, expires_at REAL NOT NULL, data BLOB NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (data, expires_at epoch seconds) for a live entry, else None."""
+        if not self.enabled:
+            return None
+        try:
+            row = self._conn().execute(
+                'SELECT data, expires_at FROM related_cache WHERE key = ? AND expires_at > ?',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            return json_loads(row[0]), row[1]
+        except Exception as e:
+            print(f"WARNING: Disabling related-record disk cache: {e}")
+            self.enabled = False
+            return None
+
+    def set(self, key: str, data: Any, expire: float):
+        if not self.enabled:
+            return
+        try:
+            self._conn().execute(
+                'INSERT OR REPLACE INTO related_cache (key, expires_at, data) VALUES (?, ?, ?)',
+                (key, time.time() + expire, json_dumps(data)),
+            )
+        except Exception as e:
+            print(f"WARNING: Disabling related-record disk cache: {e}")
+            self.enabled = False
 
-def debug_log(message: str, category: str = "general"):
-    """Conditional debug logging based on configuration"""
-    if category == "odoo_data" and Config.DEBUG_ODOO_DATA:
-        print(f"DEBUG: {message}")
-    elif category == "bot_logic" and Config.DEBUG_BOT_LOGIC:
-        print(f"DEBUG: {message}")
-    elif category == "general" and Config.VERBOSE_LOGS:
-        print(f"DEBUG: {message}")
 
 class EmployeeService:
     """Service for Odoo employee data operations with role-based access and caching"""
     
     def __init__(self, odoo_service):
         self.odoo_service = odoo_service
-        self.cache = {}
-        self.cache_expiry = {}
+        # Expiries in all *_expiry dicts are time.monotonic() deadlines (float seconds)
+        # Bounded LRU: search keys (term + filters) have unbounded cardinality
+        self.cache: "OrderedDict[str, Any]" = OrderedDict()
+        self.cache_expiry: Dict[str, float] = {}
+        self.cache_max_entries = 2048
+        self._cache_lock = threading.Lock()
+        # Loads currently running per cache key, shared by concurrent identical calls
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
         self.cache_duration = timedelta(hours=2)  # Cache for 2 hours (longer caching)
+        self._cache_ttl_s = self.cache_duration.total_seconds()
+        # Per-model lifetimes: reference data barely changes, employee records do daily.
+        # Models not listed here fall back to cache_duration.
+        self.model_ttls: Dict[str, timedelta] = {
+            'res.country': timedelta(days=7),
+            'res.country.state': timedelta(days=7),
+            'res.company': timedelta(hours=24),
+            'resource.calendar': timedelta(hours=24),
+            'hr.department': timedelta(hours=12),
+            'hr.job': timedelta(hours=12),
+            'hr.work.location': timedelta(hours=12),
+            'res.partner': timedelta(hours=2),
+            'hr.employee': timedelta(minutes=30),
+        }
+        self._model_ttl_s = {model: ttl.total_seconds() for model, ttl in self.model_ttls.items()}
         self.verbose = getattr(Config, 'VERBOSE_LOGS', False)
         # Related-records cache to avoid repeated Odoo calls
-        self.related_cache: Dict[str, Dict[int, Any]] = {}
-        self.related_cache_expiry: Dict[str, Dict[int, datetime]] = {}
+        # (per-model LRU, capped at related_cache_max_per_model records)
+        self.related_cache: Dict[str, "OrderedDict[int, Any]"] = {}
+        self.related_cache_expiry: Dict[str, Dict[int, float]] = {}
+        self.related_cache_max_per_model = 8192
+        # write_date of each cached related record; once an entry's TTL runs out
+        # a cheap write_date probe decides whether it can be kept or must be re-read
+        self.related_cache_write_date: Dict[str, Dict[int, str]] = {}
+        # Reference models trusted until their (long) TTL expires, never probed
+        self.unvalidated_models = frozenset({'res.country', 'res.country.state', 'res.company'})
+        # Cleared once Odoo rejects the nested web_read used to expand relations
+        self._related_web_read_ok = True
+        # Second level behind related_cache: persisted on disk and shared across workers
+        self.related_disk_cache = _RelatedRecordDiskCache(getattr(Config, 'ODOO_RELATED_CACHE_PATH', ''))
 
         # Super-fast cache for current user (persists across requests)
         self.user_fast_cache: Dict[int, Dict] = {}
-        self.user_fast_cache_expiry: Dict[int, datetime] = {}
+        self.user_fast_cache_expiry: Dict[int, float] = {}
         self.fast_cache_duration = timedelta(minutes=15)  # 15 minute super-fast cache
+        self._fast_cache_ttl_s = self.fast_cache_duration.total_seconds()
+        # Users without an employee record are remembered briefly (negative cache)
+        self.user_no_employee_ttl = timedelta(seconds=60)
+        # Per-user hr.employee field visibility (fields_get) changes only with modules/groups
+        self.fields_get_ttl = timedelta(hours=24)
         
         # Employee fields to fetch (only standard fields that exist in all Odoo instances)
         self.employee_fields = [
@@ -61,28 +201,92 @@ class EmployeeService:
             'state_id': ['name'],
             'country_id': ['name']
         }
+
+        # Related field -> Odoo model, and the fields read for each model
+        self._field_to_model = {
+            'department_id': 'hr.department',
+            'parent_id': 'hr.employee',
+            'coach_id': 'hr.employee',
+            'address_id': 'res.partner',
+            'company_id': 'res.company',
+            'job_id': 'hr.job',
+            'work_location_id': 'hr.work.location',
+            'resource_calendar_id': 'resource.calendar',
+            'state_id': 'res.country.state',
+            'country_id': 'res.country'
+        }
+        self._model_to_fields = {
+            'hr.department': self.related_fields['department_id'],
+            'hr.employee': self.related_fields['parent_id'],
+            'res.partner': self.related_fields['address_id'],
+            'res.company': self.related_fields['company_id'],
+            'hr.job': self.related_fields['job_id'],
+            'hr.work.location': self.related_fields['work_location_id'],
+            'resource.calendar': self.related_fields['resource_calendar_id'],
+            'res.country.state': self.related_fields['state_id'],
+            'res.country': self.related_fields['country_id']
+        }
     
-    def _log(self, message: str, category: str = "general"):
-        """Log message based on category and configuration"""
-        debug_log(message, category)
+    def _log(self, message: str, category: str = "general", *args):
+        """Log message based on category and configuration (args formatted lazily)"""
+        debug_log(message, category, *args)
 
     def _is_cache_valid(self, cache_key: str) -> bool:
         """Check if cached data is still valid"""
-        if cache_key not in self.cache_expiry:
-            return False
-        return datetime.now() < self.cache_expiry[cache_key]
+        return time.monotonic() < self.cache_expiry.get(cache_key, 0.0)
     
-    def _set_cache(self, cache_key: str, data: Any):
-        """Set data in cache with expiry"""
-        self.cache[cache_key] = data
-        self.cache_expiry[cache_key] = datetime.now() + self.cache_duration
+    def _set_cache(self, cache_key: str, data: Any, ttl: Optional[timedelta] = None):
+        """Set data in cache with expiry (ttl defaults to cache_duration)"""
+        ttl_s = ttl.total_seconds() if ttl else self._cache_ttl_s
+        with self._cache_lock:
+            self.cache[cache_key] = data
+            self.cache.move_to_end(cache_key)
+            self.cache_expiry[cache_key] = time.monotonic() + ttl_s
+            # Evict least recently used entries beyond the cap
+            while len(self.cache) > self.cache_max_entries:
+                old_key, _ = self.cache.popitem(last=False)
+                self.cache_expiry.pop(old_key, None)
     
-    def _get_cache(self, cache_key: str) -> Optional[Any]:
-        """Get data from cache if valid"""
-        if self._is_cache_valid(cache_key):
+    def _get_cache(self, cache_key: str, now: Optional[float] = None) -> Optional[Any]:
+        """Get data from cache if valid (now: a time.monotonic() reading, when already taken)"""
+        if now is None:
+            now = time.monotonic()
+        with self._cache_lock:
+            expiry = self.cache_expiry.get(cache_key)
+            if expiry is None:
+                return None
+            if now >= expiry:
+                # Drop expired entries so they do not hold memory until evicted
+                self.cache.pop(cache_key, None)
+                self.cache_expiry.pop(cache_key, None)
+                return None
+            self.cache.move_to_end(cache_key)
             return self.cache[cache_key]
-        return None
     
+    def _load_once(self, cache_key: str, loader):
+        """Run loader() once for concurrent callers of the same cache_key.
+
+        The first caller performs the load; callers arriving meanwhile wait for
+        and share its result instead of issuing the same Odoo requests again.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            owner = future is None
+            if owner:
+                future = self._inflight[cache_key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = loader()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_key, None)
+
     def _make_odoo_request(self, model: str, method: str, params: Dict) -> Tuple[bool, Any]:
         """Make authenticated request to Odoo using web session"""
         try:
@@ -109,21 +313,21 @@ class EmployeeService:
             # Use session cookies for authentication
             cookies = {'session_id': self.odoo_service.session_id} if self.odoo_service.session_id else {}
             
-            # Use OdooService retry-aware post
+            # Use OdooService retry-aware post; both paths go through its pooled session
             post = getattr(self.odoo_service, 'post_with_retry', None)
             if callable(post):
                 response = post(url, json=data, cookies=cookies, timeout=30)
             else:
-                client = getattr(self.odoo_service, 'http', requests)
-                response = client.post(
+                response = self.odoo_service.http.post(
                     url,
-                    json=data,
+                    data=json_dumps(data),
+                    headers=JSON_HEADERS,
                     cookies=cookies,
                     timeout=30
                 )
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 if 'result' in result:
                     return True, result['result']
                 else:
@@ -168,15 +372,9 @@ class EmployeeService:
                     continue
                 # Extract the token after '- ' up to space or '(' or end
                 token = s[2:].strip()
-                cut = len(token)
-                for sep in [' (', ' ', '(']:
-                    idx = token.find(sep)
-                    if idx != -1:
-                        cut = min(cut, idx)
-                field = token[:cut].strip('-').strip()
+                field = _FIELD_TOKEN_SEP_RE.split(token, 1)[0].strip('-').strip()
                 # Basic sanity: only accept ascii letters, underscores and digits
-                import re
-                if field and re.match(r'^[a-zA-Z0-9_]+$', field):
+                if field and _FIELD_NAME_RE.match(field):
                     forbidden.append(field)
         except Exception:
             pass
@@ -197,7 +395,7 @@ class EmployeeService:
             return ok, data
 
         # Detect AccessError and parse forbidden fields
-        forbidden = self._parse_access_error_forbidden_fields(data)
+        forbidden = set(self._parse_access_error_forbidden_fields(data))
         if forbidden:
             allowed_fields = [f for f in fields if f not in forbidden]
             if not allowed_fields:
@@ -219,7 +417,7 @@ class EmployeeService:
         ok, data = self._make_odoo_request(model, 'read', params)
         if ok:
             return ok, data
-        forbidden = self._parse_access_error_forbidden_fields(data)
+        forbidden = set(self._parse_access_error_forbidden_fields(data))
         if forbidden:
             allowed_fields = [f for f in fields if f not in forbidden] or ['id']
             params2 = {'args': [record_ids], 'kwargs': {'fields': allowed_fields}}
@@ -239,7 +437,7 @@ class EmployeeService:
         ok, data = self._make_odoo_request('hr.employee', 'search_read', params)
         if ok:
             return ok, data
-        forbidden = self._parse_access_error_forbidden_fields(data)
+        forbidden = set(self._parse_access_error_forbidden_fields(data))
         if forbidden:
             allowed_fields = [f for f in fields if f not in forbidden]
             if not allowed_fields:
@@ -270,42 +468,43 @@ class EmployeeService:
     
     def _expand_related_data(self, employee_data: Dict) -> Dict:
         """Expand related field data using batched reads and per-record caching"""
-        expanded_data = employee_data.copy()
+        return self._expand_related_data_bulk([employee_data])[0]
 
-        # Map field names to model names
-        model_mapping = {
-            'department_id': 'hr.department',
-            'parent_id': 'hr.employee',
-            'coach_id': 'hr.employee',
-            'address_id': 'res.partner',
-            'company_id': 'res.company',
-            'job_id': 'hr.job',
-            'work_location_id': 'hr.work.location',
-            'resource_calendar_id': 'resource.calendar',
-            'state_id': 'res.country.state',
-            'country_id': 'res.country'
-        }
+    def _expand_related_data_bulk(self, employees: List[Dict]) -> List[Dict]:
+        """Expand related field data for several employee records at once.
 
-        # Collect IDs per model
-        model_to_ids: Dict[str, List[int]] = {}
-        field_to_model: Dict[str, str] = {}
-        for field in self.related_fields.keys():
-            if field in employee_data and employee_data[field]:
+        Related ids are collected across all records and deduplicated per
+        model, so the cache is probed once per record id and each missing
+        record is fetched once: first through a single nested web_read over
+        all employees, then per model (in parallel) for anything left.
+        Records with no related fields set are returned unchanged (not copied).
+        """
+        # Collect IDs per model; remember which (field, model, id) each record needs
+        model_to_ids: Dict[str, Set[int]] = {}
+        per_employee: List[Optional[List[Tuple[str, str, int]]]] = []
+        for employee_data in employees:
+            # Only the related fields this record actually has set
+            present = [field for field in self.related_fields if employee_data.get(field)]
+            if not present:
+                per_employee.append(None)
+                continue
+            links: List[Tuple[str, str, int]] = []
+            for field in present:
                 value = employee_data[field]
                 record_id = value[0] if isinstance(value, list) else value if isinstance(value, int) else None
                 if record_id:
-                    model_name = model_mapping.get(field)
+                    model_name = self._field_to_model.get(field)
                     if model_name:
-                        field_to_model[field] = model_name
-                        model_to_ids.setdefault(model_name, [])
-                        if record_id not in model_to_ids[model_name]:
-                            model_to_ids[model_name].append(record_id)
+                        links.append((field, model_name, record_id))
+                        model_to_ids.setdefault(model_name, set()).add(record_id)
+            per_employee.append(links)
 
         # Optimize with parallel batch fetching
         model_results: Dict[str, Dict[int, Dict]] = {}
         fetch_tasks = []  # Store models that need fetching
 
         # First pass: collect cached data and identify what needs fetching
+        missing_by_model: Dict[str, List[int]] = {}
         for model_name, ids in model_to_ids.items():
             to_fetch: List[int] = []
             combined: Dict[int, Dict] = {}
@@ -315,16 +514,68 @@ class EmployeeService:
                     combined[rid] = cached
                 else:
                     to_fetch.append(rid)
-
             model_results[model_name] = combined
+            if to_fetch:
+                missing_by_model[model_name] = to_fetch
+
+        # Expired entries whose record has not changed in Odoo are kept. The
+        # write_date probes of different models overlap on the shared workers
+        probe_models = [
+            model_name for model_name, ids in missing_by_model.items()
+            if model_name not in self.unvalidated_models and self._has_revalidation_candidates(model_name, ids)
+        ]
+        if len(probe_models) == 1:
+            probes = [(probe_models[0], self._validate_related_cache(probe_models[0], missing_by_model[probe_models[0]]))]
+        elif probe_models:
+            futures = {
+                _RELATED_FETCH_EXECUTOR.submit(self._validate_related_cache, model_name, missing_by_model[model_name]): model_name
+                for model_name in probe_models
+            }
+            probes = [(futures[future], future.result()) for future in as_completed(futures)]
+        else:
+            probes = []
+        for model_name, stale in probes:
+            stale_ids = set(stale)
+            records = self.related_cache.get(model_name, {})
+            for rid in missing_by_model[model_name]:
+                if rid in stale_ids:
+                    continue
+                data = records.get(rid)
+                if data is not None:
+                    model_results[model_name][rid] = data
+                else:
+                    # Evicted meanwhile by another request; read it again
+                    stale.append(rid)
+            missing_by_model[model_name] = stale
+
+        for model_name, to_fetch in missing_by_model.items():
             if to_fetch:
                 fetch_tasks.append((model_name, to_fetch, self._get_fields_for_model(model_name)))
 
+        # Single round trip: read every missing relation through the employees
+        # themselves with a nested web_read; per-model reads remain the fallback
+        employee_ids = [emp['id'] for emp, links in zip(employees, per_employee) if links and emp.get('id')]
+        if fetch_tasks and employee_ids:
+            missing = {model_name: set(ids) for model_name, ids, _ in fetch_tasks}
+            fields_needed: Dict[str, str] = {}
+            for links in per_employee:
+                for field, model_name, record_id in links or ():
+                    if record_id in missing.get(model_name, ()):
+                        fields_needed[field] = model_name
+            nested = self._fetch_related_via_web_read(employee_ids, fields_needed)
+            if nested:
+                for model_name, records in nested.items():
+                    for rid, rec in records.items():
+                        model_results[model_name][rid] = rec
+                        self._set_related_cache(model_name, rid, rec)
+                fetch_tasks = [
+                    (model_name, [rid for rid in ids if rid not in model_results[model_name]], fields)
+                    for model_name, ids, fields in fetch_tasks
+                ]
+                fetch_tasks = [task for task in fetch_tasks if task[1]]
+
         # Parallel batch fetch using threading for I/O operations
         if fetch_tasks:
-            import concurrent.futures
-            import threading
-
             def fetch_model_batch(model_name, ids, fields):
                 try:
                     success, data = self._fetch_related_records_batch(model_name, ids, fields)
@@ -335,83 +586,257 @@ class EmployeeService:
                     print(f"ERROR: Failed to fetch {model_name} batch: {e}")
                     return model_name, []
 
-            # Execute parallel requests (max 3 concurrent to avoid overwhelming Odoo)
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                future_to_model = {
-                    executor.submit(fetch_model_batch, model_name, ids, fields): model_name
-                    for model_name, ids, fields in fetch_tasks
-                }
+            if len(fetch_tasks) == 1:
+                # Nothing to overlap; skip the hand-off to a worker thread
+                batches = [fetch_model_batch(*fetch_tasks[0])]
+            else:
+                # Shared, long-lived workers instead of a new pool per call
+                futures = [_RELATED_FETCH_EXECUTOR.submit(fetch_model_batch, *task) for task in fetch_tasks]
+                batches = (future.result() for future in as_completed(futures))
 
-                for future in concurrent.futures.as_completed(future_to_model):
-                    model_name, data = future.result()
-                    for rec in data:
-                        if isinstance(rec, dict) and 'id' in rec:
-                            model_results[model_name][rec['id']] = rec
-                            self._set_related_cache(model_name, rec['id'], rec)
+            for model_name, data in batches:
+                for rec in data:
+                    if isinstance(rec, dict) and 'id' in rec:
+                        model_results[model_name][rec['id']] = rec
+                        self._set_related_cache(model_name, rec['id'], rec)
 
-        # Fill expanded_data
-        for field in self.related_fields.keys():
-            if field in employee_data and employee_data[field]:
-                value = employee_data[field]
-                record_id = value[0] if isinstance(value, list) else value if isinstance(value, int) else None
-                model_name = field_to_model.get(field)
-                if record_id and model_name:
-                    related_map = model_results.get(model_name, {})
-                    if record_id in related_map:
-                        expanded_data[f"{field}_details"] = related_map[record_id]
+        # Fill expanded data for each record
+        expanded: List[Dict] = []
+        for employee_data, links in zip(employees, per_employee):
+            if links is None:
+                expanded.append(employee_data)
+                continue
+            expanded_data = employee_data.copy()
+            for field, model_name, record_id in links:
+                related_map = model_results.get(model_name, {})
+                if record_id in related_map:
+                    expanded_data[f"{field}_details"] = related_map[record_id]
+                else:
+                    value = employee_data[field]
+                    if isinstance(value, list) and len(value) > 1:
+                        expanded_data[f"{field}_details"] = {"name": value[1], "error": "Details unavailable"}
                     else:
-                        if isinstance(value, list) and len(value) > 1:
-                            expanded_data[f"{field}_details"] = {"name": value[1], "error": "Details unavailable"}
-                        else:
-                            expanded_data[f"{field}_details"] = {"error": "Could not retrieve details"}
+                        expanded_data[f"{field}_details"] = {"error": "Could not retrieve details"}
+            expanded.append(expanded_data)
+        return expanded
 
-        return expanded_data
-    
     def _get_fields_for_model(self, model_name: str) -> List[str]:
-        reverse_map = {
-            'hr.department': self.related_fields['department_id'],
-            'hr.employee': self.related_fields['parent_id'],
-            'res.partner': self.related_fields['address_id'],
-            'res.company': self.related_fields['company_id'],
-            'hr.job': self.related_fields['job_id'],
-            'hr.work.location': self.related_fields['work_location_id'],
-            'resource.calendar': self.related_fields['resource_calendar_id'],
-            'res.country.state': self.related_fields['state_id'],
-            'res.country': self.related_fields['country_id']
+        return self._model_to_fields.get(model_name, ['name'])
+
+    def _fetch_related_via_web_read(self, employee_ids: List[int], fields_needed: Dict[str, str]) -> Dict[str, Dict[int, Dict]]:
+        """Read related records for several many2one fields of employees in one RPC.
+
+        fields_needed maps employee field -> related model. Uses ``web_read``
+        with a nested specification; nested many2one values are normalized to
+        the ``[id, name]`` shape ``read`` returns. Returns {model: {id: record}}
+        for the relations that came back, or {} when web_read is unavailable.
+        """
+        if not fields_needed or not self._related_web_read_ok:
+            return {}
+        specification = {}
+        for field, model_name in fields_needed.items():
+            sub_spec = {}
+            for sub_field in self._get_fields_for_model(model_name) + ['write_date']:
+                sub_spec[sub_field] = {'fields': {'display_name': {}}} if sub_field.endswith('_id') else {}
+            specification[field] = {'fields': sub_spec}
+        params = {
+            'args': [employee_ids],
+            'kwargs': {'specification': specification}
         }
-        return reverse_map.get(model_name, ['name'])
+        ok, data = self._make_odoo_request('hr.employee', 'web_read', params)
+        if not ok or not isinstance(data, list) or not data:
+            debug_log("web_read expansion unavailable, using per-model reads: %s", "odoo_data", data)
+            if isinstance(data, dict) and self._is_missing_method_error(data, 'web_read'):
+                # No web_read on this server (added in 17.0); stop trying. Other
+                # errors (access rights, expired session, server hiccup) only
+                # send this call to the per-model reads.
+                self._related_web_read_ok = False
+            return {}
+        results: Dict[str, Dict[int, Dict]] = {}
+        for row in data:
+            if not isinstance(row, dict):
+                continue
+            for field, value in row.items():
+                if field in fields_needed and isinstance(value, dict) and value.get('id'):
+                    model_records = results.setdefault(fields_needed[field], {})
+                    if value['id'] in model_records:
+                        continue
+                    rec = dict(value)
+                    for sub_field, sub_value in rec.items():
+                        if isinstance(sub_value, dict) and 'id' in sub_value:
+                            rec[sub_field] = [sub_value['id'], sub_value.get('display_name') or '']
+                    model_records[value['id']] = rec
+        return results
+
+    @staticmethod
+    def _is_missing_method_error(error: Dict, method: str) -> bool:
+        """True when an Odoo JSON-RPC error says the called method does not exist."""
+        data = error.get('data') if isinstance(error.get('data'), dict) else {}
+        text = ' '.join(
+            str(part) for part in (data.get('name'), data.get('message'), error.get('message')) if part
+        ).lower()
+        return (
+            f"has no attribute '{method}'" in text
+            or 'method not found' in text
+            or ('does not exist' in text and method in text)
+        )
 
     def _fetch_related_records_batch(self, model_name: str, record_ids: List[int], fields: List[str]) -> Tuple[bool, Any]:
         """Fetch multiple related records in one request"""
         try:
             params = {
                 'args': [record_ids],
-                'kwargs': {'fields': fields}
+                'kwargs': {'fields': fields + ['write_date']}
             }
             return self._make_odoo_request(model_name, 'read', params)
         except Exception as e:
             return False, f"Error fetching related records: {str(e)}"
 
-    def _set_related_cache(self, model_name: str, record_id: int, data: Any):
-        if model_name not in self.related_cache:
-            self.related_cache[model_name] = {}
+    def _related_disk_key(self, model_name: str, record_id: int) -> str:
+        # The disk store may outlive a switch between Odoo databases; keep them apart
+        return f"{self.odoo_service.odoo_db}:{model_name}:{record_id}"
+
+    def _set_related_cache_memory(self, model_name: str, record_id: int, data: Any, expiry: float):
+        records = self.related_cache.get(model_name)
+        if records is None:
+            records = self.related_cache[model_name] = OrderedDict()
             self.related_cache_expiry[model_name] = {}
-        self.related_cache[model_name][record_id] = data
-        self.related_cache_expiry[model_name][record_id] = datetime.now() + self.cache_duration
+        expiries = self.related_cache_expiry[model_name]
+        records[record_id] = data
+        records.move_to_end(record_id)
+        expiries[record_id] = expiry
+        # Evict least recently stored records beyond the per-model cap
+        while len(records) > self.related_cache_max_per_model:
+            old_id, _ = records.popitem(last=False)
+            expiries.pop(old_id, None)
+            self.related_cache_write_date.get(model_name, {}).pop(old_id, None)
+
+    def _set_related_cache(self, model_name: str, record_id: int, data: Any):
+        # write_date is fetched alongside the record only for revalidation;
+        # it is kept aside (and removed from the record) rather than returned
+        write_date = data.pop('write_date', None) if isinstance(data, dict) else None
+        if write_date:
+            self.related_cache_write_date.setdefault(model_name, {})[record_id] = write_date
+        ttl_s = self._model_ttl_s.get(model_name, self._cache_ttl_s)
+        self._set_related_cache_memory(model_name, record_id, data, time.monotonic() + ttl_s)
+        self.related_disk_cache.set(
+            self._related_disk_key(model_name, record_id), data, ttl_s
+        )
+
+    def _validate_related_cache(self, model_name: str, record_ids: List[int]) -> List[int]:
+        """Return the subset of record_ids that must be re-read from Odoo.
+
+        Expired in-memory entries with a known write_date are checked with one
+        search_read of just id/write_date; unchanged ones get a fresh TTL (in
+        memory and in the disk store) and are served from memory. Unknown ids, changed records and probe failures
+        are all returned for a full read.
+        """
+        known = self.related_cache_write_date.get(model_name, {})
+        cached = self.related_cache.get(model_name, {})
+        candidates = [rid for rid in record_ids if rid in known and rid in cached]
+        if not candidates:
+            return list(record_ids)
+        params = {
+            'args': [[['id', 'in', candidates]]],
+            'kwargs': {'fields': ['write_date']}
+        }
+        ok, rows = self._make_odoo_request(model_name, 'search_read', params)
+        if not ok or not isinstance(rows, list):
+            return list(record_ids)
+        current = {row['id']: row.get('write_date') for row in rows if isinstance(row, dict) and 'id' in row}
+        ttl_s = self._model_ttl_s.get(model_name, self._cache_ttl_s)
+        expiry = time.monotonic() + ttl_s
+        stale: List[int] = []
+        for rid in record_ids:
+            data = cached.get(rid)
+            if rid in known and data is not None and current.get(rid) == known[rid]:
+                self.related_cache_expiry[model_name][rid] = expiry
+                # Extend the disk copy too, so a restarted worker does not re-read it
+                self.related_disk_cache.set(self._related_disk_key(model_name, rid), data, ttl_s)
+            else:
+                stale.append(rid)
+        return stale
+
+    def _has_revalidation_candidates(self, model_name: str, record_ids: List[int]) -> bool:
+        """True when some of record_ids are cached with a known write_date (worth a probe)."""
+        known = self.related_cache_write_date.get(model_name, {})
+        cached = self.related_cache.get(model_name, {})
+        return any(rid in known and rid in cached for rid in record_ids)
 
     def _get_related_cache(self, model_name: str, record_id: int) -> Optional[Any]:
-        if model_name in self.related_cache and record_id in self.related_cache_expiry.get(model_name, {}):
-            if datetime.now() < self.related_cache_expiry[model_name][record_id]:
-                return self.related_cache[model_name][record_id]
+        expiry = self.related_cache_expiry.get(model_name, {}).get(record_id)
+        if expiry is not None and time.monotonic() < expiry:
+            return self.related_cache[model_name][record_id]
+        # Fall back to the disk store (filled by this or another worker) and
+        # promote the hit into memory for the rest of its lifetime
+        hit = self.related_disk_cache.get(self._related_disk_key(model_name, record_id))
+        if hit is not None:
+            data, expires_at = hit
+            # The disk store keeps wall-clock deadlines; convert to the monotonic clock
+            self._set_related_cache_memory(model_name, record_id, data, time.monotonic() + (expires_at - time.time()))
+            return data
         return None
     
+    def _cached_fields_get(self, model: str) -> Optional[Set[str]]:
+        """Return the field names of model visible to the current user, or None.
+
+        Odoo's fields_get leaves out fields the user's groups cannot read, so
+        the result is cached per user (24h) rather than per model. None means
+        the call failed and callers should keep their static field lists.
+        """
+        cache_key = f"fields_get_{model}_{self.odoo_service.user_id}"
+        cached = self._get_cache(cache_key)
+        if cached is not None:
+            return cached
+        ok, data = self._make_odoo_request(model, 'fields_get', {
+            'args': [],
+            'kwargs': {'attributes': ['type']}
+        })
+        if not ok or not isinstance(data, dict) or not data:
+            debug_log("fields_get failed for %s: %s", "odoo_data", model, data)
+            return None
+        names = frozenset(data)
+        self._set_cache(cache_key, names, self.fields_get_ttl)
+        return names
+
+    def _filter_employee_fields(self, fields: List[str]) -> List[str]:
+        """Keep only the hr.employee fields that exist and are readable for this user."""
+        available = self._cached_fields_get('hr.employee')
+        if available is None:
+            return fields
+        return [f for f in fields if f in available] or fields
+
     def _get_available_fields(self) -> List[str]:
         """Get list of fields that actually exist in the hr.employee model"""
-        # For now, just return the standard fields to avoid fetching employee data unnecessarily
-        # This prevents the system from retrieving data for random employees when testing field availability
-        debug_log("Using standard employee fields without dynamic detection", "odoo_data")
-        return self.employee_fields
+        # One cached fields_get (no employee data is read) decides which of the
+        # standard and custom fields this user can actually read
+        return self._filter_employee_fields(self.employee_fields + self.custom_fields)
     
+    def _read_employee_for_user(self, user_id: int, fields: List[str]) -> Tuple[bool, Any]:
+        """Read the employee record linked to a res.users id in one RPC.
+
+        The user -> employee id mapping is cached (cache_duration when found,
+        user_no_employee_ttl for "no employee"): a known id is read directly,
+        a known miss costs no RPC, and otherwise one search_read both resolves
+        and reads the record. Returns (True, [record]) or (True, []) when there
+        is no employee, and (False, error) when Odoo failed (never cached).
+        """
+        cache_key = f"user_emp_id_{user_id}"
+        id_list = self._get_cache(cache_key)
+        if id_list == []:
+            return True, []
+        if id_list:
+            return self._safe_employee_read(id_list, fields)
+
+        ok, data = self._safe_employee_search_read([('user_id', '=', user_id)], fields, limit=1)
+        if not ok or not isinstance(data, list):
+            return False, data
+        if data and isinstance(data[0], dict) and data[0].get('id'):
+            self._set_cache(cache_key, [data[0]['id']])
+        elif not data:
+            self._set_cache(cache_key, [], self.user_no_employee_ttl)
+        return True, data
+
     def get_current_user_employee_data(self) -> Tuple[bool, Any]:
         """Get employee data for the currently logged-in user with fast caching"""
         try:
@@ -420,39 +845,32 @@ class EmployeeService:
                 return False, "Not authenticated with Odoo"
 
             user_id = self.odoo_service.user_id
+            now = time.monotonic()
 
             # Check super-fast cache first
-            if user_id in self.user_fast_cache_expiry:
-                if datetime.now() < self.user_fast_cache_expiry[user_id]:
+            fast_expiry = self.user_fast_cache_expiry.get(user_id)
+            if fast_expiry is not None:
+                if now < fast_expiry:
                     return True, self.user_fast_cache[user_id]
-                else:
-                    # Expired, remove from cache
-                    del self.user_fast_cache[user_id]
-                    del self.user_fast_cache_expiry[user_id]
-            
+                # Expired, remove from cache
+                del self.user_fast_cache[user_id]
+                del self.user_fast_cache_expiry[user_id]
+
+            # Then the standard cache
             cache_key = f"employee_data_{user_id}"
-            
-            # Check cache first
-            cached_data = self._get_cache(cache_key)
+            cached_data = self._get_cache(cache_key, now)
             if cached_data:
                 return True, cached_data
             
             # Start with a conservative field set to avoid common AccessError fields
-            available_fields = self._get_safe_public_employee_fields()
+            available_fields = self._filter_employee_fields(self._get_safe_public_employee_fields())
             
-            # Fetch employee id first (lightweight), then read details by id to avoid heavy search_read payloads
-            search_params = {
-                'args': [[('user_id', '=', user_id)]],
-                'kwargs': {'limit': 1}
-            }
-            ok_ids, id_list = self._make_odoo_request('hr.employee', 'search', search_params)
-            if not ok_ids or not isinstance(id_list, list) or not id_list:
+            # One RPC: read by the cached employee id, or search_read by user
+            # (safe wrappers avoid AccessError field violations)
+            success, data = self._read_employee_for_user(user_id, available_fields)
+            if success and not data:
                 return False, "No employee record found for current user"
 
-            # Chunked read (single id, but keep structure for future batch use)
-            # Use safe read wrapper to avoid AccessError field violations
-            success, data = self._safe_employee_read(id_list, available_fields)
-            
             if success and data:
                 if isinstance(data, list) and len(data) > 0:
                     employee_data = data[0]  # read returns list of dicts
@@ -461,11 +879,11 @@ class EmployeeService:
                     expanded_data = self._expand_related_data(employee_data)
 
                     # Cache the result (standard cache)
-                    self._set_cache(cache_key, expanded_data)
+                    self._set_cache(cache_key, expanded_data, self.model_ttls['hr.employee'])
 
                     # Store in super-fast cache for current user
                     self.user_fast_cache[user_id] = expanded_data
-                    self.user_fast_cache_expiry[user_id] = datetime.now() + self.fast_cache_duration
+                    self.user_fast_cache_expiry[user_id] = time.monotonic() + self._fast_cache_ttl_s
 
                     return True, expanded_data
                 else:
@@ -484,7 +902,9 @@ class EmployeeService:
             
             # Check user permissions (simplified - in production, implement proper role checking)
             user_id = self.odoo_service.user_id
-            cache_key = f"employee_search_{user_id}_{search_term}_{str(filters)}"
+            # Canonical (sorted-key) encoding so equivalent filter dicts share a slot
+            key_material = json_dumps([user_id, search_term, filters or {}], sort_keys=True)
+            cache_key = f"employee_search_{hashlib.blake2b(key_material, digest_size=16).hexdigest()}"
             
             # Check cache first
             cached_data = self._get_cache(cache_key)
@@ -509,18 +929,15 @@ class EmployeeService:
             # For now, limit to current user's data (implement role-based access later)
             domain.append(('user_id', '=', user_id))
             
-            safe_fields = self._get_safe_public_employee_fields()
+            safe_fields = self._filter_employee_fields(self._get_safe_public_employee_fields())
             success, data = self._safe_employee_search_read(domain, safe_fields, limit=100)
             
             if success:
-                # Expand related data for each employee
-                expanded_data = []
-                for employee in data:
-                    expanded_employee = self._expand_related_data(employee)
-                    expanded_data.append(expanded_employee)
+                # Expand related data for all employees together (shared lookups)
+                expanded_data = self._expand_related_data_bulk(data)
                 
                 # Cache the result
-                self._set_cache(cache_key, expanded_data)
+                self._set_cache(cache_key, expanded_data, self.model_ttls['hr.employee'])
                 
                 return True, expanded_data
             else:
@@ -548,14 +965,14 @@ class EmployeeService:
             if cached_data:
                 return True, cached_data
             
-            success, data = self._safe_employee_read([employee_id], self.employee_fields)
+            success, data = self._safe_employee_read([employee_id], self._get_available_fields())
             
             if success and data:
                 employee_data = data[0]
                 expanded_data = self._expand_related_data(employee_data)
                 
                 # Cache the result
-                self._set_cache(cache_key, expanded_data)
+                self._set_cache(cache_key, expanded_data, self.model_ttls['hr.employee'])
                 
                 return True, expanded_data
             else:
@@ -566,8 +983,9 @@ class EmployeeService:
     
     def clear_cache(self):
         """Clear all cached data"""
-        self.cache.clear()
-        self.cache_expiry.clear()
+        with self._cache_lock:
+            self.cache.clear()
+            self.cache_expiry.clear()
     
     def get_current_user_avatar(self, size: int = 128) -> Tuple[bool, Any]:
         """Fetch the current user's avatar at a specific size (e.g., image_128).
@@ -588,16 +1006,11 @@ class EmployeeService:
             if cached is not None:
                 return True, cached
 
-            # Resolve employee id
-            ok_ids, id_list = self._make_odoo_request('hr.employee', 'search', {
-                'args': [[('user_id', '=', user_id)]],
-                'kwargs': {'limit': 1}
-            })
-            if not ok_ids or not isinstance(id_list, list) or not id_list:
+            # Resolve and read the employee in one RPC; safe wrappers handle a
+            # restricted image field
+            ok_read, data = self._read_employee_for_user(user_id, [field_name])
+            if ok_read and not data:
                 return False, "No employee found"
-
-            # Use safe read in case the image field is restricted
-            ok_read, data = self._safe_employee_read(id_list, [field_name])
             if not ok_read or not isinstance(data, list) or not data:
                 # Try fallback on res.users image
                 ok_user, data_user = self._safe_model_read('res.users', [self.odoo_service.user_id], [field_name])
@@ -616,14 +1029,134 @@ class EmployeeService:
         except Exception as e:
             return False, f"Avatar fetch error: {e}"
 
+    def get_current_user_avatar_bytes(self, size: int = 128) -> Tuple[bool, Any]:
+        """Fetch the current user's avatar as raw image bytes.
+
+        Downloads /web/image/hr.employee/<id>/image_<size> directly, which skips
+        the base64 inflation of a JSON-RPC read and the decode afterwards.
+        Falls back to get_current_user_avatar when that route is refused.
+        Returns (True, (bytes, content_type)) or (False, message).
+        """
+        try:
+            if not self.odoo_service.is_authenticated():
+                return False, "Not authenticated with Odoo"
+
+            size = 128 if size not in (128, 256, 512, 1920) else size
+            field_name = f"image_{size}"
+
+            user_id = self.odoo_service.user_id
+            cache_key = f"avatar_bytes_{user_id}_{field_name}"
+            cached = self._get_cache(cache_key)
+            if cached is not None:
+                return True, cached
+
+            ok_emp, data = self._read_employee_for_user(user_id, ['id'])
+            if ok_emp and not data:
+                return False, "No employee found"
+            if ok_emp and isinstance(data, list) and isinstance(data[0], dict) and data[0].get('id'):
+                session_ok, _ = self.odoo_service.ensure_active_session()
+                if session_ok:
+                    url = f"{self.odoo_service.odoo_url}/web/image/hr.employee/{data[0]['id']}/{field_name}"
+                    cookies = {'session_id': self.odoo_service.session_id} if self.odoo_service.session_id else {}
+                    # No redirects: an expired session answers with a login page, not an image
+                    response = self.odoo_service.http.get(url, cookies=cookies, timeout=30, allow_redirects=False)
+                    content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip()
+                    if response.status_code == 200 and content_type.startswith('image/') and response.content:
+                        result = (response.content, content_type)
+                        self._set_cache(cache_key, result)
+                        return True, result
+                    debug_log("/web/image avatar refused (HTTP %s), using JSON-RPC read", "odoo_data", response.status_code)
+
+            ok_img, img = self.get_current_user_avatar(size=size)
+            if not ok_img:
+                return False, img
+            data_bytes = base64.b64decode(img)
+            result = (data_bytes, _sniff_image_mime(data_bytes))
+            self._set_cache(cache_key, result)
+            return True, result
+        except Exception as e:
+            return False, f"Avatar fetch error: {e}"
+
+    def get_avatars_bulk(self, employee_ids: List[int], size: int = 128) -> Tuple[bool, Any]:
+        """Fetch avatars (base64) for many employees in at most two RPCs.
+
+        One hr.employee read for every id not cached yet, then a single
+        res.users read for the employees whose own image is missing. Returns
+        (True, {employee_id: base64 or ''}) or (False, message).
+        """
+        try:
+            if not self.odoo_service.is_authenticated():
+                return False, "Not authenticated with Odoo"
+
+            size = 128 if size not in (128, 256, 512, 1920) else size
+            field_name = f"image_{size}"
+
+            avatars: Dict[int, str] = {}
+            missing: List[int] = []
+            for emp_id in dict.fromkeys(i for i in employee_ids or [] if isinstance(i, int)):
+                cached = self._get_cache(f"avatar_emp_{emp_id}_{field_name}")
+                if cached is not None:
+                    avatars[emp_id] = cached
+                else:
+                    missing.append(emp_id)
+            if not missing:
+                return True, avatars
+
+            ok, rows = self._safe_employee_read(missing, ['user_id', field_name])
+            if not ok:
+                return False, rows
+            rows = rows if isinstance(rows, list) else []
+
+            # Employees without their own image fall back to the linked user's
+            user_by_employee = {
+                r.get('id'): self._m2o_id(r.get('user_id'))
+                for r in rows if not r.get(field_name)
+            }
+            user_images: Dict[int, str] = {}
+            user_ids = [u for u in set(user_by_employee.values()) if u]
+            if user_ids:
+                ok_users, users = self._safe_model_read('res.users', user_ids, [field_name])
+                if ok_users and isinstance(users, list):
+                    user_images = {u.get('id'): u.get(field_name) or '' for u in users}
+
+            for r in rows:
+                emp_id = r.get('id')
+                img = r.get(field_name) or user_images.get(user_by_employee.get(emp_id), '')
+                avatars[emp_id] = img
+                self._set_cache(f"avatar_emp_{emp_id}_{field_name}", img)
+            return True, avatars
+        except Exception as e:
+            return False, f"Avatar fetch error: {e}"
+
     def get_cache_stats(self) -> Dict:
-        """Get cache statistics"""
+        """Get cache statistics (O(1); expired entries are dropped on access or evicted)"""
         return {
             'cache_size': len(self.cache),
-            'cache_keys': list(self.cache.keys()),
-            'expired_entries': len([k for k in self.cache_expiry.keys() if not self._is_cache_valid(k)])
+            'max_entries': self.cache_max_entries,
+            'ttl_seconds': self._cache_ttl_s
         }
 
+    @staticmethod
+    def _m2o_id(value: Any) -> Optional[int]:
+        """Id of a many2one value ([id, name] or a bare id), else None.
+
+        Odoo's empty many2one (False) passes through unchanged. Exact class
+        checks: JSON-RPC values are plain lists/ints, no subclass walk needed.
+        """
+        cls = value.__class__
+        if cls is list:
+            return value[0] if value else None
+        if cls is int or cls is bool:
+            return value
+        return None
+
+    @staticmethod
+    def _m2o_name(value: Any) -> str:
+        """Display name of a many2one [id, name] value, else ''."""
+        if value.__class__ is list and len(value) > 1:
+            return value[1] or ''
+        return ''
+
     @staticmethod
     def _normalize_emp_code(raw: Any) -> str:
         """Return canonical attendance emp_code, or empty string when not tracked."""
@@ -640,11 +1173,13 @@ class EmployeeService:
         except Exception:
             return ''
 
-    def get_direct_reports_current_user(self) -> Tuple[bool, Any]:
+    def get_direct_reports_current_user(self, include_avatars: bool = False) -> Tuple[bool, Any]:
         """Return a list of direct reports (team members) for the current user.
 
         Each entry includes minimal profile: name, job_title, department name,
         employee id, linked user id, and attendance emp_code when available.
+        With include_avatars, entries also carry 'avatar' (base64 image_128),
+        read in the same search_read instead of one request per member.
         """
         try:
             if not self.odoo_service.is_authenticated():
@@ -658,70 +1193,142 @@ class EmployeeService:
             my_employee_id = me.get('id')
 
             # Use cache key per manager
-            cache_key = f"direct_reports_{my_employee_id}"
+            cache_key = f"direct_reports_{my_employee_id}" + ("_avatars" if include_avatars else "")
             cached = self._get_cache(cache_key)
             if cached is not None:
                 return True, cached
 
-            # Query hr.employee for children with parent_id = me
+            return self._load_once(
+                cache_key, lambda: self._fetch_direct_reports(my_employee_id, include_avatars, cache_key)
+            )
+        except Exception as e:
+            return False, f"Error fetching direct reports: {str(e)}"
+
+    def _fetch_direct_reports(self, my_employee_id: int, include_avatars: bool, cache_key: str) -> Tuple[bool, Any]:
+        """Read and normalize the direct reports of my_employee_id, caching the list."""
+        try:
+            team: List[Dict] = []
+            for ok, batch in self._iter_direct_report_batches(my_employee_id, include_avatars):
+                if not ok:
+                    return False, batch
+                team.extend(batch)
+
+            # Cache team list
+            self._set_cache(cache_key, team, self.model_ttls['hr.employee'])
+            return True, team
+        except Exception as e:
+            return False, f"Error fetching direct reports: {str(e)}"
+
+    def _iter_direct_report_batches(self, my_employee_id: int, include_avatars: bool = False,
+                                    batch_size: int = 100) -> Iterator[Tuple[bool, Any]]:
+        """Page through hr.employee children of my_employee_id.
+
+        Yields (True, normalized_members) per page of batch_size, stopping after
+        a short page; on a failed read yields (False, error) once and stops.
+        """
+        base_fields = ['name', 'job_title', 'department_id', 'user_id']
+        if include_avatars:
+            base_fields.append('image_128')
+        fields = base_fields + ['x_studio_employee_code']
+        offset = 0
+        while True:
             params = {
                 'args': [[('parent_id', '=', my_employee_id)]],
                 'kwargs': {
-                    'fields': ['name', 'job_title', 'department_id', 'user_id', 'x_studio_employee_code'],
-                    'limit': 200,
-                    'order': 'name asc'
+                    'fields': fields,
+                    'offset': offset,
+                    'limit': batch_size,
+                    # id breaks name ties so pages never overlap or skip records
+                    'order': 'name asc, id asc'
                 }
             }
-            ok2, rows = self._make_odoo_request('hr.employee', 'search_read', params)
-            if not ok2:
-                # Keep the existing team feature working if the attendance
-                # custom field is unavailable in an environment.
-                fallback_params = {
-                    'args': [[('parent_id', '=', my_employee_id)]],
-                    'kwargs': {
-                        'fields': ['name', 'job_title', 'department_id', 'user_id'],
-                        'limit': 200,
-                        'order': 'name asc'
-                    }
-                }
-                ok2, rows = self._make_odoo_request('hr.employee', 'search_read', fallback_params)
-                if not ok2:
-                    return False, rows
-
-            # Normalize
-            team = []
-            for r in rows or []:
-                dept = None
-                d = r.get('department_id')
-                if isinstance(d, list) and len(d) > 1:
-                    dept = d[1]
-                # Extract linked user id if available
-                user_id = None
-                u = r.get('user_id')
-                if isinstance(u, list) and len(u) > 0:
-                    user_id = u[0]
-                elif isinstance(u, int):
-                    user_id = u
-
-                team.append({
-                    'id': r.get('id'),
-                    'name': r.get('name'),
-                    'job_title': r.get('job_title') or '',
-                    'department': dept or '',
-                    'user_id': user_id,
-                    'emp_code': self._normalize_emp_code(r.get('x_studio_employee_code'))
-                })
+            ok, rows = self._make_odoo_request('hr.employee', 'search_read', params)
+            if not ok:
+                if fields is not base_fields:
+                    # Keep the existing team feature working if the attendance
+                    # custom field is unavailable in an environment.
+                    fields = base_fields
+                    continue
+                yield False, rows
+                return
+            rows = rows or []
+            yield True, self._normalize_team_rows(rows, include_avatars)
+            if len(rows) < batch_size:
+                return
+            offset += batch_size
 
-            # Cache team list
-            self._set_cache(cache_key, team)
-            return True, team
+    def _normalize_team_rows(self, rows: List[Dict], include_avatars: bool) -> List[Dict]:
+        """Map raw hr.employee rows to the team member dicts handed to callers."""
+        m2o_id, m2o_name, emp_code = self._m2o_id, self._m2o_name, self._normalize_emp_code
+        team = [{
+            'id': r.get('id'),
+            'name': r.get('name'),
+            'job_title': r.get('job_title') or '',
+            'department': m2o_name(r.get('department_id')),
+            'user_id': m2o_id(r.get('user_id')),
+            'emp_code': emp_code(r.get('x_studio_employee_code'))
+        } for r in rows]
+        if include_avatars:
+            for member, r in zip(team, rows):
+                member['avatar'] = r.get('image_128') or ''
+        return team
+
+    def iter_direct_reports(self, batch_size: int = 100, include_avatars: bool = False) -> Iterator[Dict]:
+        """Yield the current user's direct reports, reading them page by page.
+
+        Callers that only need the first few members can stop early without
+        the whole team being read. A cached team list is replayed instead.
+        Errors end the iteration; use get_direct_reports_current_user when the
+        failure reason matters.
+        """
+        try:
+            if not self.odoo_service.is_authenticated():
+                return
+            ok, me = self.get_current_user_employee_data()
+            if not ok or not isinstance(me, dict) or not me.get('id'):
+                return
+            my_employee_id = me.get('id')
+            cached = self._get_cache(f"direct_reports_{my_employee_id}" + ("_avatars" if include_avatars else ""))
+            if cached is not None:
+                yield from cached
+                return
+            for ok, batch in self._iter_direct_report_batches(my_employee_id, include_avatars, batch_size):
+                if not ok:
+                    self._log(f"Direct reports page failed: {batch}", "odoo_data")
+                    return
+                yield from batch
         except Exception as e:
-            return False, f"Error fetching direct reports: {str(e)}"
+            self._log(f"Error iterating direct reports: {e}", "odoo_data")
 
     def is_current_user_manager(self) -> bool:
-        """Heuristic: user is a manager if they have at least one direct report."""
+        """Heuristic: user is a manager if they have at least one direct report.
+
+        Answered from a cached team list when one exists, otherwise with a
+        search_count so the team is not read and normalized just to be counted.
+        """
         try:
-            ok, team = self.get_direct_reports_current_user()
-            return bool(ok and isinstance(team, list) and len(team) > 0)
+            if not self.odoo_service.is_authenticated():
+                return False
+            ok, me = self.get_current_user_employee_data()
+            if not ok or not isinstance(me, dict) or not me.get('id'):
+                return False
+            my_employee_id = me.get('id')
+
+            team = self._get_cache(f"direct_reports_{my_employee_id}")
+            if isinstance(team, list):
+                return len(team) > 0
+
+            cache_key = f"manager_flag_{my_employee_id}"
+            cached = self._get_cache(cache_key)
+            if cached is not None:
+                return cached
+
+            params = {'args': [[('parent_id', '=', my_employee_id)]], 'kwargs': {}}
+            ok2, count = self._make_odoo_request('hr.employee', 'search_count', params)
+            if not ok2 or not isinstance(count, int):
+                return False
+            is_manager = count > 0
+            self._set_cache(cache_key, is_manager, self.model_ttls['hr.employee'])
+            return is_manager
         except Exception:
             return False
@@ -1,23 +1,22 @@
 from typing import List, Dict, Tuple, Optional
 
+try:
+    from ..config.settings import Config
+except Exception:
+    from config.settings import Config
 
-def debug_log(message: str, category: str = "general"):
+# Category -> enabled, resolved once at import (settings are read from the env then)
+_DEBUG_FLAGS = {
+    'odoo_data': Config.DEBUG_ODOO_DATA,
+    'bot_logic': Config.DEBUG_BOT_LOGIC,
+    'knowledge_base': Config.DEBUG_KNOWLEDGE_BASE,
+    'general': Config.VERBOSE_LOGS,
+}
 
-    try:
-        try:
-            from ..config.settings import Config
-        except Exception:
-            from config.settings import Config
-        if category == "odoo_data" and Config.DEBUG_ODOO_DATA:
-            print(f"DEBUG: {message}")
-        elif category == "bot_logic" and Config.DEBUG_BOT_LOGIC:
-            print(f"DEBUG: {message}")
-        elif category == "knowledge_base" and Config.DEBUG_KNOWLEDGE_BASE:
-            print(f"DEBUG: {message}")
-        elif category == "general" and Config.VERBOSE_LOGS:
-            print(f"DEBUG: {message}")
-    except Exception:
-        pass
+
+def debug_log(message: str, category: str = "general"):
+    if _DEBUG_FLAGS.get(category):
+        print(f"DEBUG: {message}")
 
 
 class HalfDayLeaveService:
@@ -35,13 +34,10 @@ class HalfDayLeaveService:
         pass
 
     def _find_annual_leave_id(self, leave_types: List[Dict]) -> Optional[int]:
-        for lt in leave_types:
-            try:
-                if isinstance(lt, dict) and lt.get('name') == 'Annual Leave':
-                    return lt.get('id')
-            except Exception:
-                continue
-        return None
+        return next(
+            (lt.get('id') for lt in leave_types if isinstance(lt, dict) and lt.get('name') == 'Annual Leave'),
+            None
+        )
 
     def replace_unpaid_with_halfdays(self, leave_types: List[Dict]) -> List[Dict]:
         """Return a new list that keeps existing leave types and injects a synthetic 'Half Days' option.
@@ -52,49 +48,42 @@ class HalfDayLeaveService:
         if not leave_types or not isinstance(leave_types, list):
             return leave_types
 
-        annual_id = self._find_annual_leave_id(leave_types)
-
-        new_list: List[Dict] = []
-        halfday_added = False
-
-        # Detect if a Half Day entry already exists
+        # One pass: first Annual Leave id, any existing Half Day entry, and the
+        # first Unpaid Leave position (the synthetic option goes right after it)
+        annual_found = False
+        annual_id = None
         existing_halfday = False
-        for lt in leave_types:
+        unpaid_idx = None
+        for idx, lt in enumerate(leave_types):
             if not isinstance(lt, dict):
                 continue
-            name = (lt.get('name') or '').strip()
+            raw_name = lt.get('name')
+            if not annual_found and raw_name == 'Annual Leave':
+                annual_found = True
+                annual_id = lt.get('id')
+            name = (raw_name or '').strip()
             if name == self.HALF_DAY_NAME or lt.get('special_code') == 'halfday':
                 existing_halfday = True
                 break
-
-        for lt in leave_types:
-            new_list.append(lt)
-            name = (lt.get('name') or '').strip()
-            if (
-                not halfday_added
-                and annual_id is not None
-                and name == 'Unpaid Leave'
-                and not existing_halfday
-            ):
-                half_day_entry = {
-                    'id': f"halfday_{annual_id}",
-                    'name': self.HALF_DAY_NAME,
-                    'active': True,
-                    'special_code': 'halfday',
-                    'base_leave_type_id': annual_id
-                }
-                new_list.append(half_day_entry)
-                halfday_added = True
-
-        if not halfday_added and not existing_halfday and annual_id is not None:
+            if unpaid_idx is None and name == 'Unpaid Leave':
+                unpaid_idx = idx
+
+        new_list: List[Dict] = list(leave_types)
+        if existing_halfday or annual_id is None:
+            return new_list
+
+        half_day_entry = {
+            'id': f"halfday_{annual_id}",
+            'name': self.HALF_DAY_NAME,
+            'active': True,
+            'special_code': 'halfday',
+            'base_leave_type_id': annual_id
+        }
+        if unpaid_idx is not None:
+            new_list.insert(unpaid_idx + 1, half_day_entry)
+        else:
             debug_log("HalfDay: injecting 'Half Days' option at the end of the list", "bot_logic")
-            new_list.append({
-                'id': f"halfday_{annual_id}",
-                'name': self.HALF_DAY_NAME,
-                'active': True,
-                'special_code': 'halfday',
-                'base_leave_type_id': annual_id
-            })
+            new_list.append(half_day_entry)
 
         return new_list
 
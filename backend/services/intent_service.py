@@ -1,6 +1,58 @@
-from typing import Optional, Dict, Any, Tuple
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping, Tuple, Set
 from difflib import SequenceMatcher
 
+# detect() metadata is one of a few fixed values; share read-only instances
+# instead of allocating (and defensively copying) a dict per call
+_EMPTY_META: Mapping[str, Any] = MappingProxyType({})
+_LANG_META: Dict[str, Mapping[str, Any]] = {
+    lang: MappingProxyType({'lang': lang}) for lang in ('ar', 'en')
+}
+
+
+@lru_cache(maxsize=4096)
+def _cached_fuzzy_similarity(a: str, b: str) -> float:
+    """Return a fuzzy similarity between 0..1 using multiple heuristics.
+
+    - Raw ratio via SequenceMatcher
+    - Token-sort ratio to handle word order variations
+
+    Module-level so the cache key is just the two strings; keyword lists never
+    change after IntentService.__init__, so results stay valid.
+    """
+    if not a or not b:
+        return 0.0
+    a_norm = ' '.join(a.split())
+    b_norm = ' '.join(b.split())
+    ratio_raw = _sequence_ratio(a_norm, b_norm)
+    a_tokens = ' '.join(sorted(a_norm.split()))
+    b_tokens = ' '.join(sorted(b_norm.split()))
+    ratio_token = _sequence_ratio(a_tokens, b_tokens)
+    return max(ratio_raw, ratio_token)
+
+
+@lru_cache(maxsize=4096)
+def _sequence_ratio(a: str, b: str) -> float:
+    """difflib ratio of two already-normalized strings.
+
+    Intent thresholds are tuned for this scorer; other ratio implementations
+    (e.g. rapidfuzz's Indel ratio) score differently and change routing.
+    """
+    return SequenceMatcher(None, a, b).ratio()
+
+
+@lru_cache(maxsize=64)
+def _substring_pattern(phrases: Tuple[str, ...]) -> 're.Pattern':
+    """Compiled alternation matching any of phrases anywhere in a string."""
+    return re.compile('|'.join(re.escape(p) for p in phrases))
+
+
+def _token_sorted(text: str) -> str:
+    """Whitespace tokens in sorted order, the form compared by token-sort scoring."""
+    return ' '.join(sorted(text.split()))
+
 
 class IntentService:
     """Lightweight fuzzy intent detector for document-related requests.
@@ -10,133 +62,219 @@ class IntentService:
 
     def __init__(self):
         # Synonyms/phrases for employment letter
-        self.employment_letter_keywords = [
+        self.employment_letter_keywords = (
             'employment letter', 'employment certificate', 'employment verification',
             'employment confirmation', 'work certificate', 'work letter', 'proof of employment'
-        ]
+        )
         # Synonyms/phrases for experience letter
-        self.experience_letter_keywords = [
+        self.experience_letter_keywords = (
             'experience letter', 'experience certificate', 'work experience letter',
             'employment experience', 'certificate of experience'
-        ]
+        )
         # Embassy / travel related cues
-        self.embassy_keywords = [
+        self.embassy_keywords = (
             'embassy', 'consulate', 'visa',
             'travel', 'travelling', 'traveling',
             'travel letter', 'travel document', 'travel documents',
             'travel paper', 'travel papers', 'travel pappers',
             'teavel', 'teavel letter', 'teavel document', 'teavel documents',
             'schengen', 'letter to', 'to embassy', 'for travelling', 'for traveling'
-        ]
-        self.document_keywords = ['document', 'letter', 'certificate', 'doc', 'file', 'documents', 'letters', 'papers', 'paper']
-        self.generate_keywords = ['generate', 'make', 'create', 'prepare', 'issue', 'download', 'need', 'want', 'get']
-        self.arabic_keywords = ['arabic', 'ar', 'عربي', 'العربية']
-        self.english_keywords = ['english', 'en']
+        )
+        self.document_keywords = ('document', 'letter', 'certificate', 'doc', 'file', 'documents', 'letters', 'papers', 'paper')
+        self.generate_keywords = ('generate', 'make', 'create', 'prepare', 'issue', 'download', 'need', 'want', 'get')
+        self.arabic_keywords = ('arabic', 'ar', 'عربي', 'العربية')
+        self.english_keywords = ('english', 'en')
         
         # Reimbursement/expense related keywords
-        self.reimbursement_keywords = [
+        self.reimbursement_keywords = (
             'reimbursement', 'expense', 'expense report', 'reimburse', 'expenses',
             'business expense', 'work expense', 'company expense', 'claim expense',
             'submit expense', 'file expense', 'request reimbursement'
-        ]
+        )
         
         # Time-off/leave related keywords
-        self.timeoff_keywords = [
+        self.timeoff_keywords = (
             'sick leave', 'sick day', 'annual leave', 'vacation', 'holiday',
             'time off', 'leave', 'day off', 'days off', 'unpaid leave',
             'medical leave', 'personal leave', 'emergency leave'
-        ]
+        )
+
+        # Phrase lists per scoring category, looked up together by detect()
+        self._category_phrases = {
+            'employment': self.employment_letter_keywords,
+            'experience': self.experience_letter_keywords,
+            'embassy': self.embassy_keywords,
+            'reimbursement': self.reimbursement_keywords,
+            'timeoff': self.timeoff_keywords,
+            'document': self.document_keywords,
+            'generate': self.generate_keywords,
+        }
+        # Language cues are single words: plain word membership, no fuzzy scoring
+        # (a ratio against 2-letter cues like 'ar'/'en' is meaningless on a sentence)
+        self._arabic_words = frozenset(self.arabic_keywords)
+        self._english_words = frozenset(self.english_keywords)
+        # Normalized and token-sorted forms of every phrase, computed once so
+        # scoring never re-splits or re-sorts keyword phrases per message
+        self._category_forms: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        for category, phrases in self._category_phrases.items():
+            norms = tuple(' '.join(p.split()) for p in phrases)
+            self._category_forms[category] = (norms, tuple(_token_sorted(p) for p in norms))
+        self._exact_phrase_categories = self._build_exact_phrase_index()
+        # Exact hits are whole-message matches only. A phrase merely contained
+        # in a longer message is scored fuzzily like any other text: questions
+        # such as "does hr sign the experience letter or does my manager?",
+        # "what's my annual leave balance", "what is the policy for business
+        # expense reimbursement?" or "how do I write a travel letter for my team
+        # member" name an anchor phrase but must not start an action flow.
+        # Intent rules in priority order; first match wins:
+        # (intent, anchor category, strong threshold, weak threshold,
+        #  hint categories any of which lets the weak threshold suffice)
+        self._rules = (
+            ('timeoff_request', 'timeoff', 0.6, 0.45, ('generate',)),
+            ('reimbursement_request', 'reimbursement', 0.6, 0.45, ('generate',)),
+            ('embassy_letter', 'embassy', 0.55, None, ()),
+            ('experience_letter', 'experience', 0.6, 0.45, ('document',)),
+            ('employment_letter', 'employment', 0.6, 0.45, ('document', 'generate')),
+        )
+        self._anchor_categories = tuple(rule[1] for rule in self._rules)
+        # Lowest score at which each category can still change detect()'s result:
+        # anchors feed the confidence of whichever rule fires (so the weakest rule
+        # threshold) and hints gate at 0.5. Fuzzy scores
+        # that provably stay below their floor are reported as 0.0 unscored.
+        weakest = min(t for rule in self._rules for t in rule[2:4] if t is not None)
+        self._score_floors = dict.fromkeys(self._anchor_categories, weakest)
+        self._score_floors.update(document=0.5, generate=0.5)
+        self._phrase_lengths = {
+            category: tuple(sorted({len(p) for p in norms}))
+            for category, (norms, _tokens) in self._category_forms.items()
+        }
+        # Chat users repeat the same short utterances a lot; memoize per normalized text
+        self._detect_cached = lru_cache(maxsize=1024)(self._detect_text)
+
+    def _build_exact_phrase_index(self) -> Dict[str, Set[str]]:
+        """Map every phrase (plain and token-sorted) to the categories using it.
+
+        A message equal to either form scores exactly 1.0 against that phrase,
+        so those categories can skip fuzzy matching altogether.
+        """
+        index: Dict[str, Set[str]] = {}
+        for category, (norms, tokens) in self._category_forms.items():
+            for form in norms + tokens:
+                index.setdefault(form, set()).add(category)
+        return index
+
+    def _exact_hits(self, text: str, text_tokens: str) -> Set[str]:
+        """Categories hit exactly: the whole message equals one of their phrases
+        (as written or token-sorted)."""
+        hits = set(self._exact_phrase_categories.get(text, ()))
+        hits.update(self._exact_phrase_categories.get(text_tokens, ()))
+        return hits
+
+    def _category_score(self, text: str, text_tokens: str, category: str, hits: Set[str]) -> float:
+        """1.0 for an exact phrase hit, otherwise the fuzzy score for the category."""
+        if category in hits:
+            return 1.0
+        # Both ratios are at most 2*min(len)/(len sum) (token sorting keeps
+        # lengths), which rules out long messages against short phrases cheaply
+        text_len = len(text)
+        bound = max(2.0 * min(text_len, n) / (text_len + n) for n in self._phrase_lengths[category])
+        if bound < self._score_floors[category] - 1e-9:
+            return 0.0
+        norms, tokens = self._category_forms[category]
+        return self._best_fuzzy_score(text, text_tokens, norms, tokens)
 
     def _normalize(self, text: str) -> str:
         return ' '.join((text or '').lower().strip().split())
 
-    def _contains_any(self, text: str, phrases: list) -> bool:
+    def _contains_any(self, text: str, phrases: Tuple[str, ...]) -> bool:
         # Retained for backward compatibility, no longer used for decisions
-        return any(p in text for p in phrases)
+        if not phrases:
+            return False
+        return _substring_pattern(tuple(phrases)).search(text) is not None
 
     def _fuzzy_similarity(self, a: str, b: str) -> float:
-        """Return a fuzzy similarity between 0..1 using multiple heuristics.
+        """Return a fuzzy similarity between 0..1 (memoized, see _cached_fuzzy_similarity)."""
+        return _cached_fuzzy_similarity(a, b)
 
-        - Raw ratio via SequenceMatcher
-        - Token-sort ratio to handle word order variations
+    def _best_fuzzy_score(self, text: str, text_tokens: str,
+                          phrases_norm: Tuple[str, ...], phrases_tok: Tuple[str, ...]) -> float:
+        """Max fuzzy similarity of text against any target phrase.
+
+        Takes the normalized and token-sorted forms of both sides, so the raw
+        and token-sort ratios are plain string comparisons.
         """
-        if not a or not b:
-            return 0.0
-        a_norm = ' '.join(a.split())
-        b_norm = ' '.join(b.split())
-        ratio_raw = SequenceMatcher(None, a_norm, b_norm).ratio()
-        a_tokens = ' '.join(sorted(a_norm.split()))
-        b_tokens = ' '.join(sorted(b_norm.split()))
-        ratio_token = SequenceMatcher(None, a_tokens, b_tokens).ratio()
-        return max(ratio_raw, ratio_token)
-
-    def _best_fuzzy_score(self, text: str, phrases: list) -> float:
-        """Max fuzzy similarity of text against any target phrase."""
-        if not text or not phrases:
+        if not text or not phrases_norm:
             return 0.0
-        return max((self._fuzzy_similarity(text, p) for p in phrases), default=0.0)
+        return max(
+            max(_sequence_ratio(text, norm), _sequence_ratio(text_tokens, tok))
+            for norm, tok in zip(phrases_norm, phrases_tok)
+        )
 
-    def detect(self, message: str) -> Tuple[Optional[str], float, Dict[str, Any]]:
+    def detect(self, message: str) -> Tuple[Optional[str], float, Mapping[str, Any]]:
         text = self._normalize(message)
         if not text:
-            return None, 0.0, {}
-
-        # Fuzzy scores per category (0..1)
-        employment_score = self._best_fuzzy_score(text, self.employment_letter_keywords)
-        experience_score = self._best_fuzzy_score(text, self.experience_letter_keywords)
-        embassy_score = self._best_fuzzy_score(text, self.embassy_keywords)
-        reimbursement_score = self._best_fuzzy_score(text, self.reimbursement_keywords)
-        timeoff_score = self._best_fuzzy_score(text, self.timeoff_keywords)
-        doc_hint_score = self._best_fuzzy_score(text, self.document_keywords)
-        gen_hint_score = self._best_fuzzy_score(text, self.generate_keywords)
-        ar_hint = self._best_fuzzy_score(text, self.arabic_keywords) >= 0.7
-        en_hint = self._best_fuzzy_score(text, self.english_keywords) >= 0.7
-
-        # Confidence components
-        has_embassy_anchor = embassy_score >= 0.55
-
-        # Confidence heuristic (weighted by hints)
-        confidence = max(employment_score, experience_score, embassy_score, reimbursement_score, timeoff_score)
-        if doc_hint_score >= 0.5:
-            confidence += 0.15
-        if gen_hint_score >= 0.5:
-            confidence += 0.1
-        confidence = min(confidence, 1.0)
-
-        # Time-off/leave requests (rule 1) - check first, highest priority
-        if timeoff_score >= 0.6 or (timeoff_score >= 0.45 and gen_hint_score >= 0.5):
-            return 'timeoff_request', max(confidence, 0.65), {}
-
-        # Reimbursement/expense requests (rule 4) - check before embassy
-        if reimbursement_score >= 0.6 or (reimbursement_score >= 0.45 and gen_hint_score >= 0.5):
-            return 'reimbursement_request', max(confidence, 0.65), {}
-
-        # Embassy/travel letters (rule 3)
-        if has_embassy_anchor:
-            base_conf = max(0.6, embassy_score)
-            return 'embassy_letter', min(1.0, base_conf + (0.1 if doc_hint_score >= 0.5 else 0.0) + (0.05 if gen_hint_score >= 0.5 else 0.0)), {}
-
-        # Experience letters (rule 1) - require explicit anchor "experience"
-        if experience_score >= 0.6 or (experience_score >= 0.45 and doc_hint_score >= 0.5):
-            return 'experience_letter', max(confidence, 0.65), {}
-
-        # Employment letters (rule 2) - require employment/work cues and not experience
-        if (employment_score >= 0.6) or (employment_score >= 0.45 and (doc_hint_score >= 0.5 or gen_hint_score >= 0.5)):
-            # Threshold ~0.6 for actionable intent
-            meta = {}
-            if ar_hint:
-                meta['lang'] = 'ar'
-            elif en_hint:
-                meta['lang'] = 'en'
-            return 'employment_letter', max(confidence, 0.65), meta
+            return None, 0.0, _EMPTY_META
+        # Metadata is a shared read-only mapping, safe to hand out from the cache
+        return self._detect_cached(text)
+
+    def _detect_text(self, text: str) -> Tuple[Optional[str], float, Mapping[str, Any]]:
+        """Classify an already-normalized, non-empty message."""
+        # Scores per category (0..1): exact phrase hits first, fuzzy matching
+        # only for categories without one. Scored lazily in rule order, so an
+        # unambiguous message (e.g. an exact time-off phrase) scores one category.
+        text_tokens = _token_sorted(text)
+        hits = self._exact_hits(text, text_tokens)
+        scores: Dict[str, float] = {}
+
+        def score(category: str) -> float:
+            if category not in scores:
+                scores[category] = self._category_score(text, text_tokens, category, hits)
+            return scores[category]
+
+        def hint(category: str) -> bool:
+            # Document/generate hints, also scored only once a rule asks for them
+            return score(category) >= 0.5
+
+        def boosted(base: float) -> float:
+            # Confidence heuristic (weighted by hints); a saturated base needs no hints
+            if base >= 1.0:
+                return 1.0
+            confidence = base
+            if hint('document'):
+                confidence += 0.15
+            if hint('generate'):
+                confidence += 0.1
+            return min(confidence, 1.0)
+
+        for intent, category, strong, weak, hints in self._rules:
+            anchor = score(category)
+            if not (anchor >= strong or (weak is not None and anchor >= weak and any(hint(h) for h in hints))):
+                continue
+            if intent == 'embassy_letter':
+                base_conf = max(0.6, anchor)
+                if base_conf >= 1.0:
+                    return intent, 1.0, _EMPTY_META
+                bonus = (0.1 if hint('document') else 0.0) + (0.05 if hint('generate') else 0.0)
+                return intent, min(1.0, base_conf + bonus), _EMPTY_META
+            # Confidence uses the best anchor overall; when this anchor alone
+            # already saturates it, the other anchors need not be scored.
+            confidence = boosted(anchor)
+            if confidence < 1.0:
+                confidence = boosted(max(score(c) for c in self._anchor_categories))
+            meta = _EMPTY_META
+            if intent == 'employment_letter':
+                words = set(text.split())
+                if not words.isdisjoint(self._arabic_words):
+                    meta = _LANG_META['ar']
+                elif not words.isdisjoint(self._english_words):
+                    meta = _LANG_META['en']
+            return intent, max(confidence, 0.65), meta
 
         # Generic document request intent
-        if doc_hint_score >= 0.5 and gen_hint_score >= 0.5:
-            # Use token overlap over doc phrases as a weak score
-            generic_conf = 0.6
-            return 'document_request', generic_conf, {}
+        if hint('document') and hint('generate'):
+            return 'document_request', 0.6, _EMPTY_META
 
-        return None, 0.0, {}
+        return None, 0.0, _EMPTY_META
 
 
 
@@ -2,7 +2,12 @@
 Service for calculating remaining leave time for employees.
 Handles leave allocations and taken leave calculations.
 """
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple, Any
 from decimal import Decimal
 
@@ -10,25 +15,172 @@ try:
     from ..config.settings import Config
 except Exception:
     from config.settings import Config
+try:
+    from .odoo_service import JSON_HEADERS, json_dumps, json_loads
+except Exception:
+    from services.odoo_service import JSON_HEADERS, json_dumps, json_loads
+
+
+# Shared pool for the parallel allocation/leave fetches; building a fresh
+# ThreadPoolExecutor per balance display cost two thread spawns every time.
+_BALANCE_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='leave-balance')
+
+# Balances (and the Odoo rows behind them) are reused for this long. Leave
+# writes made through this app call invalidate_leave_balance; anything changed
+# directly in Odoo shows up once the entry expires.
+_BALANCE_CACHE_TTL_SECONDS = 60
+_BALANCE_CACHE_MAX_ENTRIES = 2048
+
+# search_read page size; pages are read until a short one comes back, so
+# long-tenured employees are not cut off at a fixed limit
+_SEARCH_READ_PAGE_SIZE = 200
+
+# The stateful fallback skips ensure_active_session (a test call_kw round-trip)
+# for the session_id that last succeeded, until its monotonic deadline. app.py
+# swaps sessions on the shared OdooService, so any other session_id is checked.
+# post_with_retry still renews and retries once on 401/403 or session expiry.
+_SESSION_CHECK_WINDOW_SECONDS = 300
+_SESSION_OK: Tuple[Optional[str], float] = (None, 0.0)
+
+
+@lru_cache(maxsize=4096)
+def _canonical_ymd(head: str) -> Optional[date]:
+    """date for a canonical 'YYYY-MM-DD' string, else None.
+
+    Memoized: leave rows keep repeating the same days (a one-day leave's
+    date_from and date_to share one), and date objects are immutable.
+    """
+    if (len(head) == 10 and head[4] == '-' and head[7] == '-' and head.isascii()
+            and head[:4].isdigit() and head[5:7].isdigit() and head[8:].isdigit()):
+        return date(int(head[:4]), int(head[5:7]), int(head[8:]))
+    return None
+
+
+def _parse_ymd(value: Any) -> date:
+    """Date part of an Odoo 'YYYY-MM-DD[ HH:MM:SS]' value.
+
+    Canonical values are sliced directly (strptime is slow); anything else goes
+    through strptime so accepted inputs and raised errors stay the same.
+    """
+    # Odoo strings: slice the date part instead of split() building a list
+    if value.__class__ is str and value[10:11] in ('', ' '):
+        head = value[:10]
+    else:
+        head = str(value).split(' ')[0]
+    parsed = _canonical_ymd(head)
+    if parsed is not None:
+        return parsed
+    return datetime.strptime(str(value).split(' ')[0], '%Y-%m-%d').date()
+
+
+def _balance_periods(today: date) -> Tuple[date, date, date]:
+    """(annual_start, other_start, period_end) for the balance periods ending this year.
 
-def debug_log(message: str, category: str = "general"):
-    """Conditional debug logging based on configuration"""
-    if category == "odoo_data" and Config.DEBUG_ODOO_DATA:
-        print(f"DEBUG: {message}")
-    elif category == "bot_logic" and Config.DEBUG_BOT_LOGIC:
-        print(f"DEBUG: {message}")
-    elif category == "knowledge_base" and Config.DEBUG_KNOWLEDGE_BASE:
-        print(f"DEBUG: {message}")
-    elif category == "general" and Config.VERBOSE_LOGS:
-        print(f"DEBUG: {message}")
+    Annual Leave and Rest Days count the current and previous two years (e.g.
+    2026 -> 2024..2026); other types the current and previous year.
+    """
+    year = today.year
+    return date(year - 2, 1, 1), date(year - 1, 1, 1), date(year, 12, 31)
+
+
+def _as_days(value: Any) -> float:
+    """number_of_days as a float; Odoo sends floats, anything unconvertible counts as 0."""
+    if value.__class__ is float:
+        return value
+    try:
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+_DEBUG_FLAGS = {
+    'odoo_data': Config.DEBUG_ODOO_DATA,
+    'bot_logic': Config.DEBUG_BOT_LOGIC,
+    'knowledge_base': Config.DEBUG_KNOWLEDGE_BASE,
+    'general': Config.VERBOSE_LOGS,
+}
+
+
+def debug_log(message: str, category: str = "general", *args):
+    """Conditional debug logging based on configuration.
+
+    Extra args are %-formatted into message only when the category is enabled,
+    so hot paths can pass values without building the string up front.
+    """
+    if _DEBUG_FLAGS.get(category):
+        print(f"DEBUG: {message % args if args else message}")
 
 
 class LeaveBalanceService:
     """Service for calculating remaining leave balances"""
 
+    # Shared by all instances: app.py keeps one for the whole process while
+    # other callers build one per request, and invalidation must reach both.
+    # Keys are (kind, employee_id, ...) -> (expires_at, value).
+    _balance_cache: Dict[Tuple, Tuple[float, Any]] = {}
+    _balance_cache_lock = threading.Lock()
+
     def __init__(self, odoo_service):
         self.odoo_service = odoo_service
 
+    @classmethod
+    def _cache_get(cls, key: Tuple) -> Any:
+        """Cached value for key, or None if missing or expired."""
+        with cls._balance_cache_lock:
+            entry = cls._balance_cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del cls._balance_cache[key]
+                return None
+            return entry[1]
+
+    @classmethod
+    def _cache_put(cls, key: Tuple, value: Any) -> None:
+        """Store value for _BALANCE_CACHE_TTL_SECONDS, evicting expired/oldest entries when full."""
+        with cls._balance_cache_lock:
+            cache = cls._balance_cache
+            if len(cache) >= _BALANCE_CACHE_MAX_ENTRIES:
+                now = time.monotonic()
+                for stale_key in [k for k, (expires_at, _) in cache.items() if expires_at <= now]:
+                    del cache[stale_key]
+                while len(cache) >= _BALANCE_CACHE_MAX_ENTRIES:
+                    del cache[next(iter(cache))]
+            cache[key] = (time.monotonic() + _BALANCE_CACHE_TTL_SECONDS, value)
+
+    @classmethod
+    def invalidate_employee(cls, employee_id: int) -> None:
+        """Drop cached balances and rows for an employee; call after creating/changing their hr.leave records."""
+        with cls._balance_cache_lock:
+            for key in [k for k in cls._balance_cache if k[1] == employee_id]:
+                del cls._balance_cache[key]
+
+    def _search_read_memo(
+        self, employee_id: int, model: str, domain: List, fields: List[str], odoo_session_data: Dict = None
+    ) -> Tuple[bool, Any]:
+        """Paged search_read of every matching row, through the balance cache; failures are not cached."""
+        key = ('rows', employee_id, model, repr(domain), tuple(fields))
+        hit = self._cache_get(key)
+        if hit is not None:
+            return hit
+        rows = []
+        offset = 0
+        while True:
+            params = {
+                'args': [domain],
+                'kwargs': {'fields': fields, 'limit': _SEARCH_READ_PAGE_SIZE, 'offset': offset, 'order': 'id asc'}
+            }
+            success, batch = self._make_odoo_request(model, 'search_read', params, odoo_session_data)
+            if not success or not isinstance(batch, list):
+                return success, batch
+            rows.extend(batch)
+            if len(batch) < _SEARCH_READ_PAGE_SIZE:
+                break
+            offset += _SEARCH_READ_PAGE_SIZE
+        result = (True, rows)
+        self._cache_put(key, result)
+        return result
+
     def _make_odoo_request(self, model: str, method: str, params: Dict, odoo_session_data: Dict = None) -> Tuple[bool, Any]:
         """Make authenticated request to Odoo using web session or stateless request."""
         try:
@@ -62,18 +214,26 @@ class LeaveBalanceService:
                     result_error = result_dict.get('error') if isinstance(result_dict, dict) else None
                     has_result = isinstance(result_dict, dict) and 'result' in result_dict
                     if result_error and not has_result:
-                        debug_log(f"Odoo API error (stateless): {result_error} - retrying with stateful request", "odoo_data")
+                        debug_log("Odoo API error (stateless): %s - retrying with stateful request", "odoo_data", result_error)
                     else:
                         return True, result_dict.get('result', []) if isinstance(result_dict, dict) else result_dict
                 except Exception as e:
-                    debug_log(f"Stateless request failed, falling back to regular request: {str(e)}", "odoo_data")
+                    debug_log("Stateless request failed, falling back to regular request: %s", "odoo_data", e)
                     # Fall through to regular request
             
             # Fallback to regular request using OdooService session
-            # Ensure session is active before making request
-            session_ok, session_msg = self.odoo_service.ensure_active_session()
-            if not session_ok:
-                return False, f"Session error: {session_msg}"
+            # Ensure session is active before making request (skipped while a
+            # recent request on this session succeeded)
+            global _SESSION_OK
+            ok_session_id, ok_until = _SESSION_OK
+            if (ok_session_id is not None and ok_session_id == self.odoo_service.session_id
+                    and time.monotonic() < ok_until):
+                # Keep the inactivity clock behind proactive renewal moving
+                self.odoo_service.last_activity = time.time()
+            else:
+                session_ok, session_msg = self.odoo_service.ensure_active_session()
+                if not session_ok:
+                    return False, f"Session error: {session_msg}"
 
             url = f"{self.odoo_service.odoo_url}/web/dataset/call_kw"
 
@@ -99,44 +259,36 @@ class LeaveBalanceService:
                 import requests
                 response = requests.post(
                     url,
-                    json=data,
+                    data=json_dumps(data),
+                    headers=JSON_HEADERS,
                     cookies=cookies,
                     timeout=30
                 )
 
             if response.status_code == 200:
-                result = response.json()
+                # Parse the raw bytes (orjson when installed); search_read pages are large
+                result = json_loads(response.content)
                 if 'error' in result:
-                    debug_log(f"Odoo API error: {result.get('error')}", "odoo_data")
+                    _SESSION_OK = (None, 0.0)
+                    debug_log("Odoo API error: %s", "odoo_data", result.get('error'))
                     return False, result.get('error', 'Unknown error')
+                # post_with_retry may have renewed the session; key on the current id
+                _SESSION_OK = (self.odoo_service.session_id, time.monotonic() + _SESSION_CHECK_WINDOW_SECONDS)
                 return True, result.get('result', [])
             else:
+                _SESSION_OK = (None, 0.0)
                 return False, f"HTTP {response.status_code}: {response.text}"
 
         except Exception as e:
-            debug_log(f"Error making Odoo request: {str(e)}", "odoo_data")
+            _SESSION_OK = (None, 0.0)
+            debug_log("Error making Odoo request: %s", "odoo_data", e)
             return False, f"Request error: {str(e)}"
 
-    def _parse_duration_display(self, duration_str: str) -> float:
-        """
-        Parse duration_display field to extract days as float.
-        Examples: "5.0 Days", "10 Days", "0.5 Days" -> 5.0, 10.0, 0.5
-        """
-        try:
-            if not duration_str:
-                return 0.0
-            
-            # Extract number from string like "5.0 Days" or "10 Days"
-            import re
-            match = re.search(r'([\d.]+)', str(duration_str))
-            if match:
-                return float(match.group(1))
-            return 0.0
-        except Exception:
-            return 0.0
-
     def _extract_leave_type_name(self, holiday_status_id) -> Optional[str]:
         """Extract leave type name from Many2one field format [id, 'name']"""
+        # JSON-RPC many2ones are plain lists: exact class check before the general path
+        if holiday_status_id.__class__ is list:
+            return holiday_status_id[1] if len(holiday_status_id) >= 2 else None
         if isinstance(holiday_status_id, (list, tuple)) and len(holiday_status_id) >= 2:
             return holiday_status_id[1]
         elif isinstance(holiday_status_id, dict):
@@ -145,25 +297,14 @@ class LeaveBalanceService:
 
     def _extract_leave_type_id(self, holiday_status_id) -> Optional[int]:
         """Extract leave type ID from Many2one field format [id, 'name']"""
+        if holiday_status_id.__class__ is list:
+            return holiday_status_id[0] if holiday_status_id else None
         if isinstance(holiday_status_id, (list, tuple)) and len(holiday_status_id) >= 1:
             return holiday_status_id[0]
         elif isinstance(holiday_status_id, dict):
             return holiday_status_id.get('id')
         return None
 
-    def _extract_year_from_date_str(self, date_str: str) -> Optional[int]:
-        """Extract year from a date string like '2025-01-03', '01/03/2025', or with time."""
-        try:
-            if not date_str:
-                return None
-            import re
-            match = re.search(r'(\d{4})', str(date_str))
-            if match:
-                return int(match.group(1))
-        except Exception:
-            return None
-        return None
-
     def _allocation_overlaps_period(
         self, date_from_str: Any, date_to_str: Any, period_start: date, period_end: date
     ) -> bool:
@@ -185,28 +326,81 @@ class LeaveBalanceService:
                 if not date_from_str or date_from_str is False:
                     return True
                 try:
-                    date_from = datetime.strptime(str(date_from_str).split(' ')[0], '%Y-%m-%d').date()
+                    date_from = _parse_ymd(date_from_str)
                     return date_from <= period_end
                 except Exception:
                     return True
             # Parse date_to
-            date_to = datetime.strptime(str(date_to_str).split(' ')[0], '%Y-%m-%d').date()
+            date_to = _parse_ymd(date_to_str)
             if date_to < period_start:
                 return False  # Expired before period started
             # Parse date_from if present
             if date_from_str:
-                date_from = datetime.strptime(str(date_from_str).split(' ')[0], '%Y-%m-%d').date()
+                date_from = _parse_ymd(date_from_str)
                 if date_from > period_end:
                     return False  # Starts after period ended
             return True
         except Exception:
             return True  # If parsing fails, include to avoid excluding valid allocations
 
-    def get_total_allocated_leave(self, employee_id: int, start_year: int, end_year: int, odoo_session_data: Dict = None) -> Tuple[Dict[str, float], Optional[str]]:
+    def _leave_type_condition(self, leave_type_name: str) -> Tuple:
+        """Domain term restricting holiday_status_id to one leave type name.
+
+        The name is resolved by Odoo for the calling user on every query, so
+        multi-company record rules pick that user's own leave types.
+        """
+        return ('holiday_status_id.name', '=', leave_type_name)
+
+    def _sum_allocations_grouped(
+        self, employee_id: int, period_start: date, period_end: date, leave_type_name: str, odoo_session_data: Dict = None
+    ) -> Tuple[bool, Any]:
+        """Sum one leave type's allocations overlapping the period inside Odoo (read_group).
+
+        The domain mirrors _allocation_overlaps_period (a missing date_to means
+        "No limit") and the positive-days filter, so Postgres returns one summed
+        row instead of every allocation. Returns (ok, {type_name: days}).
         """
-        Get total allocated leave for the specified period (start_year to end_year) from hr.leave.allocation.
+        domain = [
+            ('employee_id', '=', employee_id),
+            ('state', '=', 'validate'),
+            self._leave_type_condition(leave_type_name),
+            ('number_of_days', '>', 0),
+            '|', ('date_to', '=', False), ('date_to', '>=', period_start.isoformat()),
+            '|', ('date_from', '=', False), ('date_from', '<=', period_end.isoformat()),
+        ]
+        params = {
+            'args': [],
+            'kwargs': {
+                'domain': domain,
+                'fields': ['number_of_days:sum'],
+                'groupby': ['holiday_status_id'],
+                'lazy': False
+            }
+        }
+        ok, groups = self._make_odoo_request('hr.leave.allocation', 'read_group', params, odoo_session_data)
+        if not ok or not isinstance(groups, list):
+            return False, groups
+        allocated = defaultdict(float)
+        for group in groups:
+            name = self._extract_leave_type_name(group.get('holiday_status_id'))
+            days = group.get('number_of_days') or 0.0
+            if name and days > 0:
+                allocated[name] += float(days)
+        return True, dict(allocated)
+
+    def get_total_allocated_leave(
+        self, employee_id: int, period_start: date, period_end: date, odoo_session_data: Dict = None,
+        leave_type_name: Optional[str] = None, fetch_start: Optional[date] = None
+    ) -> Tuple[Dict[str, float], Optional[str]]:
+        """
+        Get total allocated leave for the specified period (period_start to period_end) from hr.leave.allocation.
         Includes both regular allocations and accrual allocations. An allocation is counted if its
         validity period overlaps with the target period (not just "currently valid").
+
+        With leave_type_name, only that type is summed, server-side via read_group
+        (falls back to the row-by-row path if the grouped read fails).
+        fetch_start widens only the Odoo query, as in get_taken_leave, so
+        both balance periods share one request.
         
         Returns:
             Tuple of (allocated_dict, error_message)
@@ -215,24 +409,25 @@ class LeaveBalanceService:
             - error_message: None if successful, error string if there was a problem fetching data
         """
         try:
-            period_start = date(start_year, 1, 1)
-            period_end = date(end_year, 12, 31)
-
-            # Domain: filter by employee and state only - no date filter (we check overlap in Python)
+            if leave_type_name:
+                ok, grouped = self._sum_allocations_grouped(employee_id, period_start, period_end, leave_type_name, odoo_session_data)
+                if ok:
+                    return grouped, None
+                debug_log("Grouped allocation read failed, reading rows instead: %s", "odoo_data", grouped)
+
+            # Domain: the overlap test against the widest window (a missing date means
+            # "No limit"); the exact period is still checked per row below, so every
+            # period sharing fetch_start is served by the same (memoized) request
+            fetch_start = min(period_start, fetch_start or period_start)
             domain = [
                 ('employee_id', '=', employee_id),
-                ('state', '=', 'validate')  # Only validated allocations
+                ('state', '=', 'validate'),  # Only validated allocations
+                '|', ('date_to', '=', False), ('date_to', '>=', fetch_start.isoformat()),
+                '|', ('date_from', '=', False), ('date_from', '<=', period_end.isoformat()),
             ]
+            fields = ['holiday_status_id', 'number_of_days', 'date_from', 'date_to']
 
-            params = {
-                'args': [domain],
-                'kwargs': {
-                    'fields': ['id', 'holiday_status_id', 'number_of_days', 'date_from', 'date_to'],
-                    'limit': 500
-                }
-            }
-
-            success, allocations = self._make_odoo_request('hr.leave.allocation', 'search_read', params, odoo_session_data)
+            success, allocations = self._search_read_memo(employee_id, 'hr.leave.allocation', domain, fields, odoo_session_data)
             
             if not success:
                 error_msg = f"Failed to fetch allocations: {allocations}" if isinstance(allocations, str) else "Failed to fetch allocations"
@@ -240,73 +435,49 @@ class LeaveBalanceService:
                 # Return empty dict with error message to distinguish from "no allocations"
                 return {}, error_msg
 
-            allocated = {}
+            allocated = defaultdict(float)
             for allocation in allocations:
-                try:
-                    holiday_status_id = allocation.get('holiday_status_id')
+                # Rows are validated up front instead of wrapping each one in try/except
+                if allocation.__class__ is not dict:
+                    continue
+                holiday_status_id = allocation.get('holiday_status_id')
+                # Inline the common [id, name] shape; other shapes go through the helper
+                if holiday_status_id.__class__ is list and len(holiday_status_id) >= 2:
+                    leave_type_name = holiday_status_id[1]
+                else:
                     leave_type_name = self._extract_leave_type_name(holiday_status_id)
-                    
-                    if not leave_type_name:
-                        continue
-
-                    # Include allocation if its validity overlaps with our period
-                    # (covers both regular allocations with validity period and accrual with no end)
-                    date_from_str = allocation.get('date_from')
-                    date_to_str = allocation.get('date_to')
-                    if not self._allocation_overlaps_period(date_from_str, date_to_str, period_start, period_end):
-                        continue
-
-                    # Get number_of_days directly from the allocation
-                    number_of_days = allocation.get('number_of_days', 0)
-                    try:
-                        days = float(number_of_days)
-                    except Exception:
-                        days = 0.0
 
-                    if days <= 0:
-                        continue
+                if not leave_type_name or isinstance(leave_type_name, (list, dict)):
+                    continue
 
-                    # Sum allocations for the same leave type
-                    if leave_type_name in allocated:
-                        allocated[leave_type_name] += days
-                    else:
-                        allocated[leave_type_name] = days
+                # Include allocation if its validity overlaps with our period
+                # (covers both regular allocations with validity period and accrual with no end)
+                date_from_str = allocation.get('date_from')
+                date_to_str = allocation.get('date_to')
+                if not self._allocation_overlaps_period(date_from_str, date_to_str, period_start, period_end):
+                    continue
 
-                except Exception as e:
-                    debug_log(f"Error processing allocation: {str(e)}", "odoo_data")
+                # Get number_of_days directly from the allocation
+                days = _as_days(allocation.get('number_of_days', 0))
+                if days <= 0:
                     continue
 
-            return allocated, None
+                # Sum allocations for the same leave type
+                allocated[leave_type_name] += days
+
+            return dict(allocated), None
 
         except Exception as e:
             error_msg = f"Error getting total allocated leave: {str(e)}"
             debug_log(error_msg, "odoo_data")
             return {}, error_msg
 
-    def _count_days_in_period(self, start_date: date, end_date: date, period_start: date, period_end: date) -> float:
+    def get_taken_leave(
+        self, employee_id: int, period_start: date, period_end: date, odoo_session_data: Dict = None,
+        fetch_start: Optional[date] = None, leave_type_name: Optional[str] = None
+    ) -> Tuple[Dict[str, float], Optional[str]]:
         """
-        Count how many days of a leave fall within the target period.
-        Handles leaves that span across periods.
-        """
-        try:
-            # If leave is completely outside the period, return 0
-            if end_date < period_start or start_date > period_end:
-                return 0.0
-
-            # Calculate overlap
-            effective_start = max(start_date, period_start)
-            effective_end = min(end_date, period_end)
-
-            # Calculate days (inclusive)
-            days = (effective_end - effective_start).days + 1
-            return float(max(0, days))
-
-        except Exception:
-            return 0.0
-
-    def get_taken_leave(self, employee_id: int, start_year: int, end_year: int, odoo_session_data: Dict = None) -> Tuple[Dict[str, float], Optional[str]]:
-        """
-        Get total taken leave for the specified period (start_year to end_year) from hr.leave.
+        Get total taken leave for the specified period (period_start to period_end) from hr.leave.
         Includes leaves with state 'validate' (Approved), 'validate1' (Second Approval), or 'confirm' (To Approve).
         Handles leaves spanning multiple periods.
         
@@ -315,28 +486,28 @@ class LeaveBalanceService:
             - taken_dict: Dict mapping leave type names to taken days (float)
               Example: {'Annual Leave': 5.0, 'Sick Leave': 2.0}
             - error_message: None if successful, error string if there was a problem fetching data
+
+        fetch_start widens only the Odoo query (to an earlier date), so a
+        wider window fetched for another period can be reused from the memo;
+        leaves outside period_start..period_end are dropped/apportioned below.
+        leave_type_name narrows the query to one type; rows are still read
+        because leaves spanning the period boundary are apportioned by date.
         """
         try:
             # Domain: filter by employee, approved states (including 'confirm' - To Approve), and dates within period
-            period_start = date(start_year, 1, 1)
-            period_end = date(end_year, 12, 31)
+            fetch_start = min(period_start, fetch_start or period_start)
 
             domain = [
                 ('employee_id', '=', employee_id),
                 ('state', 'in', ['validate', 'validate1', 'confirm']),  # Approved, Second Approval, or To Approve
-                ('date_from', '<=', period_end.strftime('%Y-%m-%d')),
-                ('date_to', '>=', period_start.strftime('%Y-%m-%d'))
+                ('date_from', '<=', period_end.isoformat()),
+                ('date_to', '>=', fetch_start.isoformat())
             ]
+            if leave_type_name:
+                domain.append(self._leave_type_condition(leave_type_name))
+            fields = ['holiday_status_id', 'number_of_days', 'date_from', 'date_to']
 
-            params = {
-                'args': [domain],
-                'kwargs': {
-                    'fields': ['holiday_status_id', 'number_of_days', 'date_from', 'date_to'],
-                    'limit': 500
-                }
-            }
-
-            success, leaves = self._make_odoo_request('hr.leave', 'search_read', params, odoo_session_data)
+            success, leaves = self._search_read_memo(employee_id, 'hr.leave', domain, fields, odoo_session_data)
 
             if not success:
                 error_msg = f"Failed to fetch taken leaves: {leaves}" if isinstance(leaves, str) else "Failed to fetch taken leaves"
@@ -344,84 +515,111 @@ class LeaveBalanceService:
                 # Return empty dict with error message
                 return {}, error_msg
 
-            taken = {}
+            taken = defaultdict(float)
+            # Period bounds as day ordinals: the per-row checks below are integer compares
+            period_start_ord = period_start.toordinal()
+            period_end_ord = period_end.toordinal()
 
             for leave in leaves:
-                try:
-                    holiday_status_id = leave.get('holiday_status_id')
+                if leave.__class__ is not dict:
+                    continue
+                holiday_status_id = leave.get('holiday_status_id')
+                if holiday_status_id.__class__ is list and len(holiday_status_id) >= 2:
+                    leave_type_name = holiday_status_id[1]
+                else:
                     leave_type_name = self._extract_leave_type_name(holiday_status_id)
 
-                    if not leave_type_name:
-                        continue
-
-                    # Get Odoo's calculated number_of_days (based on working days)
-                    number_of_days = leave.get('number_of_days', 0)
-                    try:
-                        total_days = float(number_of_days)
-                    except Exception:
-                        total_days = 0.0
+                if not leave_type_name or isinstance(leave_type_name, (list, dict)):
+                    continue
 
-                    if total_days <= 0:
-                        continue
+                # Get Odoo's calculated number_of_days (based on working days)
+                total_days = _as_days(leave.get('number_of_days', 0))
+                if total_days <= 0:
+                    continue
 
-                    date_from_str = leave.get('date_from')
-                    date_to_str = leave.get('date_to')
-                    
-                    if not date_from_str or not date_to_str:
-                        # No dates available, use number_of_days directly
+                date_from_str = leave.get('date_from')
+                date_to_str = leave.get('date_to')
+                
+                if not date_from_str or not date_to_str:
+                    # No dates available, use number_of_days directly
+                    days = total_days
+                else:
+                    try:
+                        date_from = _parse_ymd(date_from_str)
+                        date_to = _parse_ymd(date_to_str)
+                    except Exception as e:
+                        # Fallback to number_of_days if date parsing fails
+                        debug_log("Date parsing error, using number_of_days directly: %s", "odoo_data", e)
+                        date_from = date_to = None
+
+                    if date_from is None:
                         days = total_days
                     else:
-                        try:
-                            date_from = datetime.strptime(date_from_str.split(' ')[0], '%Y-%m-%d').date()
-                            date_to = datetime.strptime(date_to_str.split(' ')[0], '%Y-%m-%d').date()
-                            
-                            # Check if leave spans multiple years/periods
-                            if date_from >= period_start and date_to <= period_end:
-                                # Leave is entirely within period - use number_of_days directly
-                                days = total_days
-                            elif date_from > period_end or date_to < period_start:
-                                # Leave is entirely outside period - skip (should be caught by domain but safety check)
-                                days = 0.0
-                            else:
-                                # Leave spans across period boundaries - apportion number_of_days proportionally
-                                # Calculate total calendar days in the leave period
-                                total_calendar_days = (date_to - date_from).days + 1
-                                if total_calendar_days <= 0:
-                                    days = 0.0
-                                else:
-                                    # Calculate calendar days within period
-                                    calendar_days_in_period = self._count_days_in_period(date_from, date_to, period_start, period_end)
-                                    # Apportion number_of_days proportionally
-                                    days = (total_days * calendar_days_in_period) / total_calendar_days
-                        except Exception as e:
-                            # Fallback to number_of_days if date parsing fails
-                            debug_log(f"Date parsing error, using number_of_days directly: {str(e)}", "odoo_data")
+                        from_ord = date_from.toordinal()
+                        to_ord = date_to.toordinal()
+                        if from_ord >= period_start_ord and to_ord <= period_end_ord:
+                            # Leave is entirely within period - use number_of_days directly
                             days = total_days
-
-                    if days > 0:
-                        # Sum taken days for the same leave type
-                        if leave_type_name in taken:
-                            taken[leave_type_name] += days
+                        elif from_ord > period_end_ord or to_ord < period_start_ord:
+                            # Leave is entirely outside period - skip (should be caught by domain but safety check)
+                            days = 0.0
                         else:
-                            taken[leave_type_name] = days
+                            # Leave spans across period boundaries - apportion number_of_days proportionally
+                            # by the share of its calendar days (inclusive) that fall within the period
+                            total_calendar_days = to_ord - from_ord + 1
+                            if total_calendar_days <= 0:
+                                days = 0.0
+                            else:
+                                calendar_days_in_period = min(to_ord, period_end_ord) - max(from_ord, period_start_ord) + 1
+                                days = (total_days * calendar_days_in_period) / total_calendar_days
 
-                except Exception as e:
-                    debug_log(f"Error processing leave: {str(e)}", "odoo_data")
-                    continue
+                if days > 0:
+                    # Sum taken days for the same leave type
+                    taken[leave_type_name] += days
 
-            return taken, None
+            return dict(taken), None
 
         except Exception as e:
             error_msg = f"Error getting taken leave: {str(e)}"
             debug_log(error_msg, "odoo_data")
             return {}, error_msg
 
+    def _fetch_allocated_and_taken(
+        self, employee_id: int, period_start: date, period_end: date, odoo_session_data: Dict = None,
+        leave_type_name: Optional[str] = None
+    ) -> Tuple[Dict[str, float], Optional[str], Dict[str, float], Optional[str]]:
+        """Allocated and taken leave for one period, with the two Odoo round-trips overlapped.
+
+        call_kw takes one call per HTTP request (no JSON-RPC batching), so the
+        leave fetch runs on the shared pool while this thread reads allocations.
+        Returns (allocated, alloc_error, taken, taken_error).
+        """
+        fetch_taken = self.get_taken_leave
+        try:
+            # A stateless call that renews the Odoo session writes the new id to the
+            # Flask session; carry the request context over so that is not lost on the pool thread
+            from flask import has_request_context, copy_current_request_context
+            if has_request_context():
+                fetch_taken = copy_current_request_context(fetch_taken)
+        except Exception:
+            pass
+        f_taken = _BALANCE_FETCH_EXECUTOR.submit(
+            fetch_taken, employee_id, period_start, period_end, odoo_session_data,
+            leave_type_name=leave_type_name
+        )
+        allocated, alloc_error = self.get_total_allocated_leave(
+            employee_id, period_start, period_end, odoo_session_data, leave_type_name=leave_type_name
+        )
+        taken, taken_error = f_taken.result()
+        return allocated, alloc_error, taken, taken_error
+
     def calculate_remaining_leave(self, employee_id: int, leave_type_name: Optional[str] = None, odoo_session_data: Dict = None) -> Tuple[Dict[str, float], Optional[str]]:
         """
         Calculate remaining leave time for an employee.
         
         Annual Leave and Rest Days use a 3-year period (current year + previous 2 years).
         Other leave types use a 2-year period (current year + previous year).
+        Results are cached per employee for _BALANCE_CACHE_TTL_SECONDS (see invalidate_employee).
         
         Args:
             employee_id: Employee ID
@@ -435,21 +633,31 @@ class LeaveBalanceService:
               Always returns at least the requested leave type with 0.0 if no allocations exist
             - error_message: None if successful, error string if there was a problem fetching data
         """
+        today = date.today()
+        cache_key = ('remaining', employee_id, leave_type_name, today)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return dict(cached), None
+        remaining, error = self._compute_remaining_leave(employee_id, leave_type_name, today, odoo_session_data)
+        if not error:
+            self._cache_put(cache_key, dict(remaining))
+        return remaining, error
+
+    def _compute_remaining_leave(
+        self, employee_id: int, leave_type_name: Optional[str], today: date, odoo_session_data: Dict = None
+    ) -> Tuple[Dict[str, float], Optional[str]]:
+        """Uncached body of calculate_remaining_leave."""
         try:
-            current_year = datetime.now().year
-            # Annual Leave: 3-year period (e.g. 2026 → 2024, 2025, 2026)
-            annual_start_year = current_year - 2
-            annual_end_year = current_year
-            # Other leave types: 2-year period (e.g. 2026 → 2025, 2026)
-            other_start_year = current_year - 1
-            other_end_year = current_year
+            # Annual Leave: 3-year period; other leave types: 2-year period (both end this year)
+            annual_start, other_start, period_end = _balance_periods(today)
 
             remaining = {}
 
             if leave_type_name in ('Annual Leave', 'Rest Days'):
                 # Annual Leave and Rest Days: use 3-year period
-                allocated, alloc_error = self.get_total_allocated_leave(employee_id, annual_start_year, annual_end_year, odoo_session_data)
-                taken, taken_error = self.get_taken_leave(employee_id, annual_start_year, annual_end_year, odoo_session_data)
+                allocated, alloc_error, taken, taken_error = self._fetch_allocated_and_taken(
+                    employee_id, annual_start, period_end, odoo_session_data, leave_type_name=leave_type_name
+                )
                 if alloc_error:
                     return {}, alloc_error
                 if taken_error:
@@ -459,8 +667,9 @@ class LeaveBalanceService:
                 remaining[leave_type_name] = max(0.0, allocated_days - taken_days)
             elif leave_type_name:
                 # Specific non-annual type: use 2-year period
-                allocated, alloc_error = self.get_total_allocated_leave(employee_id, other_start_year, other_end_year, odoo_session_data)
-                taken, taken_error = self.get_taken_leave(employee_id, other_start_year, other_end_year, odoo_session_data)
+                allocated, alloc_error, taken, taken_error = self._fetch_allocated_and_taken(
+                    employee_id, other_start, period_end, odoo_session_data, leave_type_name=leave_type_name
+                )
                 if alloc_error:
                     return {}, alloc_error
                 if taken_error:
@@ -470,17 +679,24 @@ class LeaveBalanceService:
                 remaining[leave_type_name] = max(0.0, allocated_days - taken_days)
             else:
                 # All types: fetch both periods and combine (Annual from 3-year, others from 2-year)
-                allocated_annual, alloc_err_a = self.get_total_allocated_leave(employee_id, annual_start_year, annual_end_year, odoo_session_data)
-                taken_annual, taken_err_a = self.get_taken_leave(employee_id, annual_start_year, annual_end_year, odoo_session_data)
-                allocated_other, alloc_err_o = self.get_total_allocated_leave(employee_id, other_start_year, other_end_year, odoo_session_data)
-                taken_other, taken_err_o = self.get_taken_leave(employee_id, other_start_year, other_end_year, odoo_session_data)
+                # The 2-year period reuses the 3-year rows (both queries widened to
+                # the 3-year window), so only two Odoo requests are made
+                allocated_annual, alloc_err_a, taken_annual, taken_err_a = self._fetch_allocated_and_taken(
+                    employee_id, annual_start, period_end, odoo_session_data
+                )
+                allocated_other, alloc_err_o = self.get_total_allocated_leave(
+                    employee_id, other_start, period_end, odoo_session_data, fetch_start=annual_start
+                )
+                taken_other, taken_err_o = self.get_taken_leave(
+                    employee_id, other_start, period_end, odoo_session_data, fetch_start=annual_start
+                )
 
                 if alloc_err_a or alloc_err_o:
                     return {}, alloc_err_a or alloc_err_o
                 if taken_err_a or taken_err_o:
                     return {}, taken_err_a or taken_err_o
 
-                all_types = set(allocated_annual.keys()) | set(allocated_other.keys()) | set(taken_annual.keys()) | set(taken_other.keys())
+                all_types = allocated_annual.keys() | allocated_other.keys() | taken_annual.keys() | taken_other.keys()
                 for leave_type in all_types:
                     if leave_type in ('Annual Leave', 'Rest Days'):
                         allocated_days = allocated_annual.get(leave_type, 0.0)
@@ -503,53 +719,48 @@ class LeaveBalanceService:
         """
         Get allocated and taken leave for display, using the same period logic as calculate_remaining_leave.
         Annual Leave and Rest Days: 3-year period. Other types: 2-year period.
-        Runs Odoo calls in parallel for faster performance.
+        Fetches the 3-year allocations and leaves in parallel (two Odoo calls);
+        the 2-year figures are computed from the same memoized rows.
+        Cached like calculate_remaining_leave.
         
         Returns:
             Tuple of (allocated_dict, taken_dict, error_message)
         """
-        import concurrent.futures
-        current_year = datetime.now().year
-        annual_start_year = current_year - 2
-        annual_end_year = current_year
-        other_start_year = current_year - 1
-        other_end_year = current_year
-
-        allocated_annual, alloc_err_a = None, None
-        taken_annual, taken_err_a = None, None
-        allocated_other, alloc_err_o = None, None
-        taken_other, taken_err_o = None, None
-
-        def fetch_annual_allocated():
-            return self.get_total_allocated_leave(employee_id, annual_start_year, annual_end_year, odoo_session_data)
-        def fetch_annual_taken():
-            return self.get_taken_leave(employee_id, annual_start_year, annual_end_year, odoo_session_data)
-        def fetch_other_allocated():
-            return self.get_total_allocated_leave(employee_id, other_start_year, other_end_year, odoo_session_data)
-        def fetch_other_taken():
-            return self.get_taken_leave(employee_id, other_start_year, other_end_year, odoo_session_data)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            f_alloc_a = executor.submit(fetch_annual_allocated)
-            f_taken_a = executor.submit(fetch_annual_taken)
-            f_alloc_o = executor.submit(fetch_other_allocated)
-            f_taken_o = executor.submit(fetch_other_taken)
-            allocated_annual, alloc_err_a = f_alloc_a.result()
-            taken_annual, taken_err_a = f_taken_a.result()
-            allocated_other, alloc_err_o = f_alloc_o.result()
-            taken_other, taken_err_o = f_taken_o.result()
+        today = date.today()
+        cache_key = ('display', employee_id, today)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return dict(cached[0]), dict(cached[1]), None
+        allocated, taken, error = self._compute_allocated_and_taken(employee_id, today, odoo_session_data)
+        if not error:
+            self._cache_put(cache_key, (dict(allocated), dict(taken)))
+        return allocated, taken, error
+
+    def _compute_allocated_and_taken(
+        self, employee_id: int, today: date, odoo_session_data: Dict = None
+    ) -> Tuple[Dict[str, float], Dict[str, float], Optional[str]]:
+        """Uncached body of get_allocated_and_taken_for_display."""
+        annual_start, other_start, period_end = _balance_periods(today)
+
+        allocated_annual, alloc_err_a, taken_annual, taken_err_a = self._fetch_allocated_and_taken(
+            employee_id, annual_start, period_end, odoo_session_data
+        )
+
+        # Served from the memo filled above: no further Odoo requests
+        allocated_other, alloc_err_o = self.get_total_allocated_leave(
+            employee_id, other_start, period_end, odoo_session_data, fetch_start=annual_start
+        )
+        taken_other, taken_err_o = self.get_taken_leave(
+            employee_id, other_start, period_end, odoo_session_data, fetch_start=annual_start
+        )
 
         if alloc_err_a or alloc_err_o:
             return {}, {}, alloc_err_a or alloc_err_o
         if taken_err_a or taken_err_o:
             return {}, {}, taken_err_a or taken_err_o
 
-        all_types = (
-            set(allocated_annual.keys())
-            | set(allocated_other.keys())
-            | set(taken_annual.keys())
-            | set(taken_other.keys())
-        )
+        # dict_keys views union directly; no per-dict set copies
+        all_types = allocated_annual.keys() | allocated_other.keys() | taken_annual.keys() | taken_other.keys()
         allocated = {}
         taken = {}
         for leave_type in all_types:
@@ -593,24 +804,28 @@ class LeaveBalanceService:
         if not remaining:
             return ""
 
-        lines = []
-        for leave_type, days in sorted(remaining.items()):
-            # Exclude Unpaid Leave from balance display (unlimited, no balance concept)
-            if leave_type == 'Unpaid Leave':
-                continue
-            
-            # Convert to hours and minutes
-            hours, minutes = self._days_to_hours_minutes(days)
-            
-            # Format days - show decimal if not whole number, otherwise show as integer
-            if days == int(days):
-                days_str = str(int(days))
-            else:
-                days_str = f"{days:.1f}"
-            
-            # Format hours:minutes
-            hours_minutes_str = f"{hours}:{minutes:02d}"
-            
-            lines.append(f"Available {leave_type}: {days_str} days ({hours_minutes_str})")
+        # Exclude Unpaid Leave from balance display (unlimited, no balance concept);
+        # filtered before sorting, and keys are unique so sorting them alone suffices
+        leave_types = sorted(leave_type for leave_type in remaining if leave_type != 'Unpaid Leave')
+        return " | ".join(
+            self._format_balance_entry(leave_type, remaining[leave_type]) for leave_type in leave_types
+        )
+
+    def _format_balance_entry(self, leave_type: str, days: float) -> str:
+        """One 'Available <type>: <days> days (<h:mm>)' segment of the balance line."""
+        # Convert to hours and minutes
+        hours, minutes = self._days_to_hours_minutes(days)
+
+        # Format days - show decimal if not whole number, otherwise show as integer
+        if days == int(days):
+            days_str = str(int(days))
+        else:
+            days_str = f"{days:.1f}"
+
+        return f"Available {leave_type}: {days_str} days ({hours}:{minutes:02d})"
+
 
-        return " | ".join(lines)
+def invalidate_leave_balance(employee_id: Optional[int]) -> None:
+    """Drop cached leave balances for an employee after their hr.leave records change."""
+    if employee_id:
+        LeaveBalanceService.invalidate_employee(employee_id)
@@ -15,6 +15,11 @@ except Exception:
         def debug_log(msg, cat):
             pass
 
+try:
+    from .leave_balance_service import invalidate_leave_balance
+except Exception:
+    from services.leave_balance_service import invalidate_leave_balance
+
 
 def _parse_datetime(dt_str: str, user_tz: Optional[str] = None) -> Tuple[str, str]:
     """Parse datetime string (DD/MM/YYYY HH:MM:SS or YYYY-MM-DD HH:MM:SS) and return (date, hour).
@@ -1395,6 +1400,7 @@ def cancel_timeoff_request(odoo_service, leave_id: int, employee_data: Dict = No
         leave_data = None
         leave_started = False
         request_date_from = None
+        request_employee_id = None
         
         try:
             read_params = {
@@ -1450,6 +1456,8 @@ def cancel_timeoff_request(odoo_service, leave_id: int, employee_data: Dict = No
             debug_log(f"[CANCEL_TIMEOFF] Delete attempt result - ok={ok_delete}, result={result_delete}", "bot_logic")
             if ok_delete:
                 debug_log(f"[CANCEL_TIMEOFF] SUCCESS: Request deleted successfully", "bot_logic")
+                # Deleted request no longer counts against the balance
+                invalidate_leave_balance(request_employee_id or employee_id)
                 return True, "Request deleted successfully"
             else:
                 debug_log(f"[CANCEL_TIMEOFF] Delete failed: {result_delete}", "bot_logic")
@@ -1489,6 +1497,8 @@ def cancel_timeoff_request(odoo_service, leave_id: int, employee_data: Dict = No
             return False, f"Failed to cancel request: {result}"
 
         debug_log(f"[CANCEL_TIMEOFF] SUCCESS: Request cancelled (state set to draft)", "bot_logic")
+        # Cancelled request no longer counts against the balance
+        invalidate_leave_balance(request_employee_id or employee_id)
         return True, "Request cancelled successfully"
     except Exception as e:
         import traceback
@@ -1869,6 +1879,9 @@ def update_timeoff_request(odoo_service, leave_id: int, leave_type_id: int,
         if not isinstance(new_leave_id, int):
             return False, f"Invalid leave ID returned: {new_leave_id}"
 
+        # Old request deleted and new one created: drop cached balance figures
+        invalidate_leave_balance(employee_id)
+
         # Step 7: Recreate attachments for the new request
         attachment_ids = []
         
@@ -3,12 +3,36 @@ import json
 import re
 import time
 import threading
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib codec is used without it
+    orjson = None
 try:
     from ..config.settings import Config
 except Exception:
     from config.settings import Config
 
+JSON_HEADERS = {'Content-Type': 'application/json'}
+# Leading bytes of a JSON-RPC reply that always contain its top-level key
+_RPC_HEAD_BYTES = 256
+
+
+def json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serialize a JSON-RPC payload straight to UTF-8 bytes (orjson when available)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, allow_nan=False, sort_keys=sort_keys).encode('utf-8')
+
+
+def json_loads(data: bytes) -> Any:
+    """Parse a JSON-RPC response body from raw bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 class OdooService:
     """Service for Odoo API integration and authentication"""
     
@@ -43,11 +67,18 @@ class OdooService:
         # /web/session/authenticate call, and Odoo would bind both logins to
         # the same Odoo session — cross-account identity bleed. Every call must
         # pass the session cookie explicitly via cookies={...}.
+        # Connection failures (nothing sent yet) are retried with a short
+        # backoff; urllib3 never replays a POST whose request already went out.
         try:
             from http.cookiejar import DefaultCookiePolicy
+            from urllib3.util.retry import Retry
             self.http = requests.Session()
             self.http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
-            adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20)
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=20,
+                max_retries=Retry(total=3, backoff_factor=0.3),
+            )
             self.http.mount('http://', adapter)
             self.http.mount('https://', adapter)
             self.http.headers.update({'Content-Type': 'application/json'})
@@ -279,6 +310,12 @@ class OdooService:
             'server_url': self.odoo_url
         }
     
+    def close(self):
+        """Close pooled keep-alive connections (call on shutdown)."""
+        close = getattr(self.http, 'close', None)
+        if isinstance(self.http, requests.Session) and callable(close):
+            close()
+
     def logout(self):
         """Logout current user"""
         self.session_id = None
@@ -521,19 +558,25 @@ class OdooService:
     def post_with_retry(self, url: str, json: dict, cookies: dict, timeout: int = 20):
         """POST helper that retries once after attempting session renewal if 401/invalid."""
         client = getattr(self, 'http', requests)
+        # Serialize once; retries resend the same bytes
+        body_bytes = json_dumps(json)
         try:
-            resp = client.post(url, json=json, cookies=cookies, timeout=timeout)
+            resp = client.post(url, data=body_bytes, headers=JSON_HEADERS, cookies=cookies, timeout=timeout)
             # Case 1: HTTP auth errors → renew and retry
             if resp.status_code in (401, 403):
                 # try renewal
                 ok, _ = self._renew_session()
                 if ok:
                     cookies = {'session_id': self.session_id} if self.session_id else {}
-                    return client.post(url, json=json, cookies=cookies, timeout=timeout)
-            # Case 2: Odoo returns 200 with JSON error payload indicating session expiry
-            if resp.status_code == 200:
+                    return client.post(url, data=body_bytes, headers=JSON_HEADERS, cookies=cookies, timeout=timeout)
+            # Case 2: Odoo returns 200 with JSON error payload indicating session expiry.
+            # Successful replies are left for the caller to parse; only bodies
+            # carrying an error key are decoded here. Odoo writes the top-level
+            # "error"/"result" key right after "jsonrpc" and "id", so only the
+            # head of the body is inspected (multi-MB reads are never scanned).
+            if resp.status_code == 200 and b'"error"' in resp.content[:_RPC_HEAD_BYTES]:
                 try:
-                    body = resp.json()
+                    body = json_loads(resp.content)
                     err = body.get('error') if isinstance(body, dict) else None
                     if isinstance(err, dict):
                         name = str(err.get('data', {}).get('name') or err.get('name') or '').lower()
@@ -548,7 +591,7 @@ class OdooService:
                             ok, _ = self._renew_session()
                             if ok:
                                 cookies = {'session_id': self.session_id} if self.session_id else {}
-                                return client.post(url, json=json, cookies=cookies, timeout=timeout)
+                                return client.post(url, data=body_bytes, headers=JSON_HEADERS, cookies=cookies, timeout=timeout)
                 except Exception:
                     # If parsing fails, fall through and return original response
                     pass
@@ -557,7 +600,7 @@ class OdooService:
             # best-effort retry after renewal
             ok, _ = self._renew_session()
             cookies = {'session_id': self.session_id} if self.session_id else {}
-            return client.post(url, json=json, cookies=cookies, timeout=timeout)
+            return client.post(url, data=body_bytes, headers=JSON_HEADERS, cookies=cookies, timeout=timeout)
 
     # ========== NEW STATELESS METHODS ==========
 
@@ -645,7 +688,9 @@ class OdooService:
         # self.http is a shared Session object that can cache cookies from other users
 
         try:
-            response = requests.post(url, json=request_data, cookies=cookies, timeout=20)
+            # Serialize once (orjson when available); retries resend the same bytes
+            body_bytes = json_dumps(request_data)
+            response = requests.post(url, data=body_bytes, headers=JSON_HEADERS, cookies=cookies, timeout=20)
 
             # Check for auth errors and retry with renewal if credentials provided
             if response.status_code in (401, 403) and username and password:
@@ -653,11 +698,12 @@ class OdooService:
                 if success and new_session_data:
                     renewed_session_data = new_session_data
                     cookies = {'session_id': new_session_data['session_id']}
-                    response = requests.post(url, json=request_data, cookies=cookies, timeout=20)
+                    response = requests.post(url, data=body_bytes, headers=JSON_HEADERS, cookies=cookies, timeout=20)
 
             # Check for Odoo session expiry errors
+            result = None
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 err = result.get('error') if isinstance(result, dict) else None
                 if isinstance(err, dict) and username and password:
                     name = str(err.get('data', {}).get('name') or err.get('name') or '').lower()
@@ -669,9 +715,16 @@ class OdooService:
                         if success and new_session_data:
                             renewed_session_data = new_session_data
                             cookies = {'session_id': new_session_data['session_id']}
-                            response = requests.post(url, json=request_data, cookies=cookies, timeout=20)
-
-            final_result = response.json() if response.status_code == 200 else {'error': f'HTTP {response.status_code}'}
+                            response = requests.post(url, data=body_bytes, headers=JSON_HEADERS, cookies=cookies, timeout=20)
+                            result = None
+
+            # Reuse the body parsed above unless a retry replaced the response
+            if response.status_code != 200:
+                final_result = {'error': f'HTTP {response.status_code}'}
+            elif result is not None:
+                final_result = result
+            else:
+                final_result = json_loads(response.content)
 
             # CRITICAL: Include renewed session data so caller can update Flask session
             if renewed_session_data:
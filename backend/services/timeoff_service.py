@@ -3,10 +3,19 @@ import json
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import re
+from concurrent.futures import ThreadPoolExecutor
 try:
     from ..config.settings import Config
 except Exception:
     from config.settings import Config
+try:
+    from .leave_balance_service import invalidate_leave_balance
+except Exception:
+    from services.leave_balance_service import invalidate_leave_balance
+
+# Shared pool for the leave-types fetch that overlaps the balance lookup when
+# building the time off form (was a fresh two-thread pool per form)
+_FORM_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='timeoff-form')
 
 def debug_log(message: str, category: str = "general"):
     """Conditional debug logging based on configuration"""
@@ -407,6 +416,8 @@ class TimeOffService:
             if success:
                 leave_id = data
                 self._log(f"Leave request created successfully with ID: {leave_id}", "bot_logic")
+                # New request counts against the balance: drop cached figures
+                invalidate_leave_balance(employee_id)
 
                 attachment_ids: List[int] = []
                 if supporting_attachments:
@@ -556,6 +567,8 @@ class TimeOffService:
 
             if success:
                 leave_id = data
+                # New request counts against the balance: drop cached figures
+                invalidate_leave_balance(employee_id)
 
                 # Handle attachments if provided
                 attachment_ids: List[int] = []
@@ -1347,8 +1360,6 @@ class TimeOffService:
         """
         try:
             # Optimize: Run leave types fetch and balance checks in parallel
-            import concurrent.futures
-            
             show_unpaid_leave = True
             additional_types = []
             leave_types = []
@@ -1378,14 +1389,11 @@ class TimeOffService:
                     debug_log(f"Error fetching allocated/taken leave: {str(e)}", "bot_logic")
                     return {}, {}
             
-            # Execute API calls in parallel for maximum speed
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                leave_types_future = executor.submit(fetch_leave_types)
-                allocated_taken_future = executor.submit(fetch_allocated_and_taken)
-                
-                # Get results
-                ok_leave_types, leave_types = leave_types_future.result()
-                allocated, taken = allocated_taken_future.result()
+            # Leave types load on the shared pool while this thread fetches balances
+            # (which fans out on the leave balance pool itself)
+            leave_types_future = _FORM_FETCH_EXECUTOR.submit(fetch_leave_types)
+            allocated, taken = fetch_allocated_and_taken()
+            ok_leave_types, leave_types = leave_types_future.result()
             
             if not ok_leave_types:
                 return False, "Failed to fetch leave types"
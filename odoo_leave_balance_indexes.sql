@@ -0,0 +1,17 @@
+-- Migration (Odoo database): composite indexes for the leave balance queries
+-- LeaveBalanceService reads hr.leave filtered by employee_id, state and the
+-- date_from/date_to window, and hr.leave.allocation filtered by employee_id
+-- and state. Odoo only ships single-column indexes for these fields, so on
+-- busy databases Postgres combines bitmaps or scans instead of seeking one
+-- employee's rows directly.
+--
+-- Run manually with psql against the Odoo database (not Supabase).
+-- CONCURRENTLY avoids locking the tables, so this must run outside a transaction.
+
+-- Taken leave: employee_id = ?, state IN (...), date_from <= ?, date_to >= ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_leave_employee_state_dates_idx
+ON public.hr_leave (employee_id, state, date_from, date_to);
+
+-- Allocations: employee_id = ?, state = 'validate'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hr_leave_allocation_employee_state_idx
+ON public.hr_leave_allocation (employee_id, state);